@@ -0,0 +1,160 @@
+import csv
+import gzip
+import json
+import os
+import shutil
+import threading
+from datetime import datetime
+import pandas as pd
+import schema
+
+# --- LOG CONFIG ---
+# The log is a directory of append-only CSV segments plus a small JSON index holding each
+# segment's row count, first sequence number and per-user counts. A segment is closed when it
+# passes SEGMENT_BYTES or the month changes; closed segments are gzipped when COMPRESS is on.
+LOG_DIR = os.environ.get("INV_PRO_LOG_DIR", "activity_log")
+SEGMENT_BYTES = int(os.environ.get("INV_PRO_LOG_SEGMENT_BYTES", 1024 * 1024))
+COMPRESS = os.environ.get("INV_PRO_LOG_COMPRESS", "1") != "0"
+COLUMNS = ["Seq", "Timestamp", "User", "Identity", "Action Detail"]
+DISPLAY_COLS = ["Timestamp", "Identity", "Action Detail"]
+
+def split_user(identity): return identity.str.split(' (', regex=False).str[0]
+
+class ActivityLog:
+    def __init__(self, log_dir=LOG_DIR, segment_bytes=SEGMENT_BYTES, compress=COMPRESS):
+        self.dir, self.segment_bytes, self.compress = log_dir, segment_bytes, compress
+        self.index_file = os.path.join(log_dir, "index.json")
+        self.lock = threading.RLock()
+        os.makedirs(log_dir, exist_ok=True)
+        try:
+            with open(self.index_file) as f: self.index = json.load(f)
+        except (OSError, ValueError): self.index = {"next_seq": 0, "segments": []}
+
+    def _save_index(self):
+        tmp = self.index_file + ".tmp"
+        with open(tmp, "w") as f: json.dump(self.index, f)
+        os.replace(tmp, self.index_file)
+
+    def _path(self, seg): return os.path.join(self.dir, seg["file"])
+
+    def _open_segment(self, month):
+        seg = {"file": f"log-{month}-{len(self.index['segments']):05d}.csv", "month": month, "rows": 0,
+               "first_seq": self.index["next_seq"], "users": {}, "closed": False}
+        with open(self._path(seg), "w", newline="", encoding="utf-8") as f: csv.writer(f).writerow(COLUMNS)
+        self.index["segments"].append(seg)
+        return seg
+
+    def _close_segment(self, seg):
+        seg["closed"] = True
+        if not self.compress: return
+        src = self._path(seg)
+        with open(src, "rb") as fi, gzip.open(src + ".gz", "wb") as fo: shutil.copyfileobj(fi, fo)
+        seg["file"] += ".gz"
+        os.remove(src)
+
+    def _current(self, month):
+        segs = self.index["segments"]
+        seg = segs[-1] if segs and not segs[-1]["closed"] else None
+        if seg is not None and (seg["month"] != month or os.path.getsize(self._path(seg)) >= self.segment_bytes):
+            self._close_segment(seg); seg = None
+        return seg or self._open_segment(month)
+
+    def append(self, timestamp, user, identity, detail, when=None):
+        """Appends one entry in O(1): a single CSV line plus a rewrite of the small index."""
+        with self.lock:
+            seg = self._current((when or datetime.now()).strftime("%Y%m"))
+            seq = self.index["next_seq"]
+            with open(self._path(seg), "a", newline="", encoding="utf-8") as f: csv.writer(f).writerow([seq, timestamp, user, identity, detail])
+            seg["rows"] += 1
+            seg["users"][user] = seg["users"].get(user, 0) + 1
+            self.index["next_seq"] = seq + 1
+            self._save_index()
+            return seq
+
+    def import_frame(self, df):
+        """Bulk-loads legacy rows (oldest first, DISPLAY_COLS) into a fresh segment."""
+        if df is None or df.empty: return 0
+        with self.lock:
+            seg = self._open_segment(datetime.now().strftime("%Y%m"))
+            out = df.reindex(columns=DISPLAY_COLS).fillna("").astype(str)
+            out.insert(0, "User", split_user(out["Identity"]))
+            out.insert(0, "Seq", range(seg["first_seq"], seg["first_seq"] + len(out)))
+            out = out[COLUMNS]
+            out.to_csv(self._path(seg), mode="a", header=False, index=False)
+            seg["rows"] = len(out)
+            seg["users"] = {str(k): int(v) for k, v in out["User"].value_counts().items()}
+            self.index["next_seq"] = seg["first_seq"] + len(out)
+            self._close_segment(seg)
+            self._save_index()
+            return len(out)
+
+    def is_empty(self):
+        with self.lock: return self.index["next_seq"] == 0
+
+    def users(self):
+        with self.lock: return sorted({u for seg in self.index["segments"] for u, n in seg["users"].items() if n})
+
+    def count(self, user=None):
+        with self.lock: return sum(seg["users"].get(user, 0) if user else seg["rows"] for seg in self.index["segments"])
+
+    def _read(self, seg):
+        # The open segment may be appended to concurrently, so it is read under the lock and
+        # trimmed to the row count the index snapshot knows about.
+        try:
+            if seg["closed"]: df = pd.read_csv(self._path(seg), dtype=str, keep_default_na=False)
+            else:
+                with self.lock:
+                    live = next((s for s in self.index["segments"] if s["first_seq"] == seg["first_seq"]), seg)
+                    df = pd.read_csv(self._path(live), dtype=str, keep_default_na=False)
+        except (OSError, ValueError): return pd.DataFrame({c: pd.Series(dtype="int64" if c == "Seq" else "object") for c in COLUMNS})
+        return df.iloc[:seg["rows"]].astype({"Seq": "int64"})
+
+    def read_page(self, page=0, page_size=100, user=None):
+        """Returns (rows, total) for one page, newest first, reading only the segments that page touches."""
+        with self.lock: segs = [dict(s) for s in self.index["segments"]]
+        total = sum(s["users"].get(user, 0) if user else s["rows"] for s in segs)
+        skip, need, parts = page * page_size, page_size, []
+        for seg in reversed(segs):
+            n = seg["users"].get(user, 0) if user else seg["rows"]
+            if n == 0: continue
+            if skip >= n:
+                skip -= n; continue
+            df = self._read(seg)
+            if user: df = df[df["User"] == user]
+            df = df.iloc[::-1].iloc[skip:skip + need]
+            parts.append(df); need -= len(df); skip = 0
+            if need <= 0: break
+        out = pd.concat(parts) if parts else pd.DataFrame(columns=COLUMNS)
+        return schema.coerce(out[DISPLAY_COLS].reset_index(drop=True), "log"), total
+
+    def rows_since(self, seq):
+        """Returns entries with Seq > seq, oldest first, indexed by Seq (used for append-only cloud sync)."""
+        with self.lock: segs = [dict(s) for s in self.index["segments"]]
+        parts = [self._read(s) for s in segs if s["rows"] and s["first_seq"] + s["rows"] - 1 > seq]
+        if not parts: return pd.DataFrame(columns=DISPLAY_COLS)
+        df = pd.concat(parts)
+        return df[df["Seq"] > seq].set_index("Seq")[DISPLAY_COLS]
+
+    def clear(self):
+        with self.lock:
+            for seg in self.index["segments"]:
+                try: os.remove(self._path(seg))
+                except OSError: pass
+            self.index["segments"] = []
+            self._save_index()
+
+_log = None
+_log_lock = threading.Lock()
+
+def get_log(legacy_loader=None):
+    """Returns the process-wide log, importing the old single-table log once on first use."""
+    global _log
+    if _log is None:
+        with _log_lock:
+            if _log is None:
+                log = ActivityLog()
+                if log.is_empty() and legacy_loader is not None:
+                    legacy = legacy_loader()
+                    if legacy is not None and not legacy.empty: log.import_frame(legacy.iloc[::-1])
+                _log = log
+    return _log
@@ -8,6 +8,17 @@ import extra_streamlit_components as stx
 import io
 import requests
 import pytz  # Required for Timezone management
+import storage
+import cloud_sync
+import activity_log
+import pricing
+import rollups
+import paging
+import schema
+import perf
+import backups
+import bulk_import
+import commits
 
 # --- PRE-FLIGHT CHECK ---
 try:
@@ -44,12 +55,20 @@ CASH_FILE = "cash_in.csv"
 LOG_FILE = "activity_log.csv"
 USERS_FILE = "users_db.csv"
 APPROVAL_FILE = "pending_approvals.csv"
-GSHEET_API_URL = "https://script.google.com/macros/s/AKfycby6TfW_R9Ir0ZM--OjuY8jfcpS4Nb7wXtKrN43tdsMP2YEBClD1cYbn6auKh89rl4LQ/exec"
+DATA_FILES = [DB_FILE, STOCK_FILE, SALES_FILE, EXPENSE_FILE, CASH_FILE, LOG_FILE, USERS_FILE]
+GSHEET_API_URL = os.environ.get("INV_PRO_GSHEET_URL", "https://script.google.com/macros/s/AKfycby6TfW_R9Ir0ZM--OjuY8jfcpS4Nb7wXtKrN43tdsMP2YEBClD1cYbn6auKh89rl4LQ/exec")
+SCHEMA_NAMES = {DB_FILE: "inventory", STOCK_FILE: "stock", SALES_FILE: "sales", EXPENSE_FILE: "expenditures", CASH_FILE: "cash_in", USERS_FILE: "users", LOG_FILE: "log"}
+# THE ACTIVITY LOG IS NOT SNAPSHOTTED: IT IS AN APPEND-ONLY AUDIT TRAIL IN ITS OWN SEGMENT FILES (SEE activity_log.py),
+# MIRRORED TO THE "Logs" SHEET, AND A RESTORE MUST NOT ROLL BACK THE RECORD OF WHAT HAPPENED (THE RESTORE ITSELF INCLUDED)
+BACKUP_FILES = [DB_FILE, STOCK_FILE, SALES_FILE, EXPENSE_FILE, CASH_FILE, USERS_FILE]
+SHEET_FILES = {"Database": DB_FILE, "Inventory": STOCK_FILE, "Sales": SALES_FILE, "Expenses": EXPENSE_FILE, "CashIn": CASH_FILE, "Users": USERS_FILE}
 
 EXPENSE_COLS = ["Cost per Unit", "Boxed Cost"]
 CORE_COLS = ["Product Name"] + EXPENSE_COLS
 
 if not os.path.exists("backups"): os.makedirs("backups")
+storage.get_backend(migrate_files=DATA_FILES)
+backup_store = backups.get_store(BACKUP_FILES)
 
 SALES_ORDER = ["Date", "Customer", "Product", "Qty", "Price Tier", "Cost", "Boxed Cost", "Price Value", "Profit", "Discount", "Total", "Status", "Payment"]
 
@@ -67,28 +86,22 @@ st.markdown(f"""
     """, unsafe_allow_html=True)
 
 # --- GOOGLE SHEETS SYNC HELPERS ---
+# Pushes are queued and sent by a background worker (see cloud_sync.SyncWorker), so editors never wait on Apps Script.
+# ACTIVITY LOG: APPEND-ONLY SEGMENTS, SYNCED TO THE "Logs" SHEET AS APPENDS (REGISTERED BEFORE THE WORKER STARTS,
+# SO A LOGS PUSH RECOVERED FROM ITS JOURNAL IS SENT AS A TAIL)
+action_log = activity_log.get_log(legacy_loader=lambda: storage.read_table(LOG_FILE))
+sync_worker = cloud_sync.get_worker(GSHEET_API_URL, loader=lambda sheet: storage.read_table(SHEET_FILES[sheet]) if sheet in SHEET_FILES else None,
+                                    tails={"Logs": action_log.rows_since})
+
 def sync_to_google(df, sheet_name):
-    try:
-        if df is None or df.empty: return False
-        df_sync = df.copy()
-        for col in df_sync.columns:
-            if pd.api.types.is_datetime64_any_dtype(df_sync[col]) or pd.api.types.is_extension_array_dtype(df_sync[col]):
-                df_sync[col] = df_sync[col].astype(str)
-            df_sync[col] = df_sync[col].fillna("")
-        data = df_sync.to_dict(orient='records')
-        payload = {"sheet": sheet_name, "data": data, "action": "update"}
-        response = requests.post(GSHEET_API_URL, json=payload, timeout=15)
-        if response.status_code == 200:
-            st.session_state.last_sync = get_now().strftime("%I:%M:%S %p")
-            return True
-        return False
-    except: return False
+    """Queues a push of sheet_name; with df None the worker re-reads the stored table (after a merged save)."""
+    if df is not None and df.empty: return False
+    with perf.span("sync", rows=0 if df is None else len(df)): sync_worker.enqueue(sheet_name, df)
+    return True
 
 def fetch_from_google(sheet_name):
-    try:
-        response = requests.get(f"{GSHEET_API_URL}?sheet={sheet_name}", timeout=10)
-        if response.status_code == 200: return pd.DataFrame(response.json().get("data", []))
-    except: return None
+    try: return cloud_sync.fetch_sheet(GSHEET_API_URL, sheet_name, sync_worker.session)
+    except (requests.RequestException, ValueError): return None
 
 # --- SECURITY HELPERS ---
 def make_hashes(password): return hashlib.sha256(str.encode(password)).hexdigest()
@@ -96,38 +109,49 @@ def check_hashes(password, hashed_text): return make_hashes(password) == hashed_
 
 cookie_manager = stx.CookieManager()
 
+# LOADS AND SAVES GO THROUGH commits.Store (SHARED WITH bench.py); THE HELPERS BELOW ADD THE SESSION STATE AROUND THEM
+store = commits.Store(SCHEMA_NAMES, sheets={f: s for s, f in SHEET_FILES.items()}, push=sync_to_google, today=lambda: get_now().date())
+
 def load_data(file, defaults):
-    if os.path.exists(file) and os.path.getsize(file) > 0:
-        try:
-            df = pd.read_csv(file)
-            for col in defaults.keys():
-                if col not in df.columns:
-                    is_num = False
-                    if defaults[col] and isinstance(defaults[col][0], (int, float)):
-                        is_num = True
-                    df[col] = 0.0 if is_num else ""
-            if not df.empty and "Date" in df.columns:
-                df["Date"] = pd.to_datetime(df["Date"], errors='coerce').dt.date
-                df["Date"] = df["Date"].fillna(get_now().date())
-            return df
-        except: pass
-    clean_defaults = {k: [] for k in defaults.keys()}
-    return pd.DataFrame(clean_defaults)
+    """Returns the shared, cached frame for file; copy() it before editing cells in place."""
+    df = store.load(file, defaults)
+    st.session_state.setdefault("loaded_versions", {})[file] = storage.table_version(df)
+    return df
+
+def base_version(df, file):
+    """The table version df was loaded at: its own, else the one this session last loaded."""
+    base = storage.table_version(df)
+    return st.session_state.get("loaded_versions", {}).get(file) if base is None else base
+
+def saved(written, file):
+    if not written["merged"]: st.session_state.setdefault("loaded_versions", {})[file] = written["version"]
+    return written
+
+def clashed(e):
+    st.session_state.flash = f"⚠️ {e}. Your change was not saved; the latest data has been reloaded."
+    st.session_state.editor_epoch = st.session_state.get("editor_epoch", 0) + 1
+    return False
 
 def save_data(df, file, sync_name=None): 
-    df.to_csv(file, index=False)
-    if sync_name: sync_to_google(df, sync_name)
+    """Writes df as the new content of file, merged with any rows other sessions saved since it was
+    loaded. Returns storage.write_table's result, or False, with a warning for the next run, when it
+    clashes with their edits. After a merged save, rows df appended were stored under new ids."""
+    try: return saved(store.save(df, file, base=base_version(df, file), sheet=sync_name), file)
+    except storage.WriteConflict as e: return clashed(e)
+
+def is_edited(ed, view):
+    """The editor round-trip check each editable page runs on every rerun."""
+    with perf.span("diff", rows=len(view)): return not ed.equals(view)
+
+def rerun():
+    perf.finish(); st.rerun()
 
 def log_action(action_detail):
     u_name, u_role = st.session_state.get('user', 'Unknown'), st.session_state.get('role', 'System')
-    now_str = get_now_str()
-    new_log = pd.DataFrame({"Timestamp": [now_str], "Identity": [f"{u_name} ({u_role})"], "Action Detail": [action_detail]})
-    log_df = pd.concat([new_log, load_data(LOG_FILE, {"Timestamp":[], "Identity":[], "Action Detail":[]})], ignore_index=True)
-    save_data(log_df, LOG_FILE, sync_name="Logs")
+    action_log.append(get_now_str(), u_name, f"{u_name} ({u_role})", action_detail, when=get_now())
+    sync_worker.enqueue("Logs", None)
 
 # --- INITIALIZATION ---
-if 'last_sync' not in st.session_state: st.session_state.last_sync = "Never"
-
 # USER DB INITIALIZATION WITH FAIL-SAFE "ACCOUNT" CREDENTIALS
 default_users = {
     "Username": ["Musika", "account"], 
@@ -140,24 +164,98 @@ users_df = load_data(USERS_FILE, default_users)
 # Double check that 'account' exists in the loaded dataframe
 if "account" not in users_df["Username"].values:
     new_admin = pd.DataFrame({"Username": ["account"], "Password": [make_hashes("account")], "Role": ["Admin"], "Status": ["Approved"]})
-    users_df = pd.concat([users_df, new_admin], ignore_index=True)
+    users_df = storage.add_rows(users_df, new_admin)
     save_data(users_df, USERS_FILE)
 
-db_df = load_data(DB_FILE, {"Product Name": ["Item 1"], "Cost per Unit": [0.0], "Boxed Cost": [0.0]})
-product_list = sorted(db_df["Product Name"].dropna().unique().tolist())
-price_tiers_list = [c for c in db_df.columns if c not in CORE_COLS]
+# TABLES ARE LOADED LAZILY PER PAGE (SEE PAGE_TABLES) FROM THE SHARED CACHE
+TABLES = {
+    "inventory": (DB_FILE, {"Product Name": ["Item 1"], "Cost per Unit": [0.0], "Boxed Cost": [0.0]}),
+    "stock": (STOCK_FILE, {"Product Name": ["Item 1"], "Quantity": [0], "Status": ["In Stock"], "Date": [get_now().date()]}),
+    "sales": (SALES_FILE, {c: [] for c in SALES_ORDER}),
+    "expenditures": (EXPENSE_FILE, {"Date": [], "Item": [], "Cost": []}),
+    "cash_in": (CASH_FILE, {"Date": [], "Source": [], "Amount": []}),
+}
+PAGE_TABLES = {
+    "Dashboard": ["inventory", "stock"],
+    "Database": ["inventory"],
+    "Inventory": ["inventory", "stock"],
+    "Sales": ["inventory", "stock", "sales"],
+    "Expenditures": ["expenditures", "cash_in"],
+    "Admin": list(TABLES.keys()),
+    "Log": [],
+}
+
+store.defaults.update(TABLES.values())
+
+def get_stock_ledger(): return store.stock_ledger(STOCK_FILE)
 
-st.session_state.inventory = db_df
-st.session_state.stock = load_data(STOCK_FILE, {"Product Name": ["Item 1"], "Quantity": [0], "Status": ["In Stock"], "Date": [get_now().date()]})
+# MONTHLY ROLLUPS FOR THE DASHBOARD, KEPT CURRENT BY save_rolled()
+ROLLUPS = {"sales": rollups.sales_rollup, "expenditures": lambda df: rollups.amount_rollup(df, "Cost"), "cash_in": lambda df: rollups.amount_rollup(df, "Amount")}
 
-if 'sales' not in st.session_state:
-    st.session_state.sales = load_data(SALES_FILE, {c: [] for c in SALES_ORDER})
-else:
-    if "Price Value" not in st.session_state.sales.columns:
-        st.session_state.sales["Price Value"] = 0.0
+def get_rollup(key):
+    return storage.cached_table(TABLES[key][0], lambda: ROLLUPS[key](load_data(*TABLES[key])), key=commits.ROLLUP_KEY, copy=False)
 
-st.session_state.expenditures = load_data(EXPENSE_FILE, {"Date": [], "Item": [], "Cost": []})
-st.session_state.cash_in = load_data(CASH_FILE, {"Date": [], "Source": [], "Amount": []})
+def save_rolled(key, df, old_rows=None, new_rows=None, sync_name=None):
+    """save_data for a rolled-up table that also folds the replaced/added rows into its rollup."""
+    file = TABLES[key][0]
+    try: return saved(store.save_rolled(df, file, old_rows, new_rows, base=base_version(df, file), sheet=sync_name), file)
+    except storage.WriteConflict as e: return clashed(e)
+
+def stock_deducted(s_df):
+    """Files the stock frame store.deduct_stock saved for this session (False: nothing was sold).
+    Returns False, with a warning for the next run, if the deduction kept clashing."""
+    if s_df is None:
+        st.session_state.flash = "⚠️ The sale was saved, but its stock deduction kept clashing with other edits. Adjust the stock lots by hand."
+        return False
+    if s_df is not False: st.session_state.stock = s_df
+    return True
+
+def deduct_stock(demands): return stock_deducted(store.deduct_stock(demands, STOCK_FILE))
+
+def editor_window(key, df, equals=None, contains=None):
+    """Filter and paging controls for a large editor. Returns the visible slice (newest first) and an
+    editor key that changes with the window, so only that slice is sent to the browser and diffed."""
+    equals, contains = equals or {}, contains or {}
+    wc = st.columns([1.6] + [1.2] * (len(equals) + len(contains)) + [0.7, 0.9])
+    rng = wc[0].date_input("Date Range", value=(), key=f"{key}_rng")
+    start, end = (tuple(rng) + (None, None))[:2] if isinstance(rng, (list, tuple)) else (rng, rng)
+    i, eq, ct = 1, {}, {}
+    for col, (label, options) in equals.items():
+        eq[col] = wc[i].selectbox(label, [""] + options, key=f"{key}_eq_{col}"); i += 1
+    for col, label in contains.items():
+        ct[col] = wc[i].text_input(label, key=f"{key}_ct_{col}"); i += 1
+    size = wc[i].selectbox("Rows", [50, 100, 250, 500], index=1, key=f"{key}_size")
+    sub = paging.filter_rows(df, start, end, eq, ct)
+    pages = max(1, -(-len(sub) // size))
+    pg = wc[i + 1].number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, key=f"{key}_pg_{pages}")
+    st.caption(f"{len(sub):,} of {len(df):,} rows match")
+    sig = (start, end, tuple(eq.items()), tuple(ct.items()), size, pg, st.session_state.get("editor_epoch", 0))
+    return schema.editable(paging.page_rows(sub, pg - 1, size)), f"{key}_ed_{abs(hash(sig))}"
+
+def import_panel(kind, label, products=(), index=None):
+    """Upload, validation preview and confirm button for a bulk import. Returns (rows, file name)
+    once the user confirms, otherwise None; rejected rows are shown and never imported."""
+    with st.expander(f"📥 Bulk Import {label}"):
+        ic = st.columns([3, 1])
+        up = ic[0].file_uploader("CSV or Excel file", type=["csv", "xlsx"], key=f"imp_{kind}_{st.session_state.get('import_epoch', 0)}")
+        ic[1].download_button("Template", bulk_import.template(kind), file_name=f"{kind}_template.csv", mime="text/csv", key=f"imp_tpl_{kind}")
+        if up is None: return None
+        try: good, bad = bulk_import.validate(bulk_import.read_upload(up), kind, products, index, today=get_now().date())
+        except (ValueError, ImportError) as e:
+            st.error(f"Could not read {up.name}: {e}"); return None
+        st.caption(f"{len(good):,} row(s) ready · {len(bad):,} rejected")
+        if not bad.empty: st.dataframe(bad, use_container_width=True, hide_index=True, height=200)
+        if not good.empty: st.dataframe(good.head(100), use_container_width=True, hide_index=True, height=200)
+        if not good.empty and st.button(f"✅ Import {len(good):,} Row(s)", key=f"imp_go_{kind}"):
+            st.session_state.import_epoch = st.session_state.get("import_epoch", 0) + 1
+            return good, up.name
+    return None
+
+def load_page_tables(page):
+    needed = PAGE_TABLES.get(page, [])
+    for key in TABLES:
+        if key in needed: st.session_state[key] = load_data(*TABLES[key])
+        else: st.session_state.pop(key, None)
 
 # --- AUTHENTICATION ---
 if 'logged_in' not in st.session_state: st.session_state.logged_in = False
@@ -184,7 +282,7 @@ if not st.session_state.logged_in:
                         st.session_state.logged_in, st.session_state.user, st.session_state.role = True, u, res.iloc[0]['Role']
                         if rem: cookie_manager.set("inv_pro_user", u, expires_at=get_now().replace(year=get_now().year + 1))
                         log_action("User successfully logged in.")
-                        st.rerun()
+                        rerun()
                     else: st.error("Account pending approval.")
                 else: st.error("Invalid credentials.")
     with t2:
@@ -193,7 +291,7 @@ if not st.session_state.logged_in:
             if nu in users_df['Username'].values: st.error("User exists.")
             else:
                 new_u = pd.DataFrame({"Username": [nu], "Password": [make_hashes(np)], "Role": ["Staff"], "Status": ["Pending"]})
-                save_data(pd.concat([users_df, new_u], ignore_index=True), USERS_FILE, sync_name="Users")
+                save_data(storage.add_rows(users_df, new_u), USERS_FILE, sync_name="Users")
                 st.success("Request sent to Admin.")
     st.stop()
 
@@ -211,48 +309,68 @@ with st.sidebar:
         admin_btn_label = f"🛡️ Admin Page (🚨 {p_users})" if p_users > 0 else "🛡️ Admin Page"
         if st.button(admin_btn_label): st.session_state.current_page = "Admin"
     st.write("---")
-    st.write(f"☁️ Cloud Sync: **{st.session_state.last_sync}**")
+    sync_stat = sync_worker.status()
+    last_ok = sync_stat["last_success"].astimezone(MANILA_TZ).strftime("%I:%M:%S %p") if sync_stat["last_success"] else "Never"
+    st.write(f"☁️ Cloud Sync: **{last_ok}**")
+    if sync_stat["depth"]: st.caption(f"⏳ {sync_stat['depth']} pending" + (f" ({sync_stat['retrying']} retrying)" if sync_stat["retrying"] else ""))
+    for sheet, (sent, total) in sync_stat["progress"].items():
+        if total: st.caption(f"⬆️ {sheet} {sent * 100 // total}%")
+    if sync_stat["last_error"] and sync_stat["retrying"]: st.caption(f"⚠️ {sync_stat['last_error'][1]}")
     if st.button("🚪 Logout"): 
-        cookie_manager.delete("inv_pro_user"); log_action("User logged out."); st.session_state.logged_in = False; st.rerun()
+        cookie_manager.delete("inv_pro_user"); log_action("User logged out."); st.session_state.logged_in = False; rerun()
 
 page = st.session_state.current_page
+perf.begin(page, st.session_state.user)
+if "flash" in st.session_state: st.warning(st.session_state.pop("flash"))
+load_page_tables(page)
+if "inventory" in st.session_state:
+    db_df = st.session_state.inventory
+    product_list = sorted(db_df["Product Name"].dropna().unique().tolist())
+    price_tiers_list = [c for c in db_df.columns if c not in CORE_COLS]
 
 if page == "Dashboard":
     st.markdown("<h1>📊 Dashboard</h1>", unsafe_allow_html=True)
     with st.container(border=True):
         f1, f2, f3 = st.columns([1, 1, 1])
-        dash_sales = st.session_state.sales.copy()
-        dash_sales["Date"] = pd.to_datetime(dash_sales["Date"], errors='coerce')
-        y_list = sorted(dash_sales["Date"].dt.year.dropna().unique().tolist(), reverse=True)
+        sales_roll, exp_roll, cash_roll = get_rollup("sales"), get_rollup("expenditures"), get_rollup("cash_in")
+        y_list = sales_roll.years()
         if not y_list: y_list = [get_now().year]
         s_y = f1.selectbox("Year", y_list)
         s_m = f2.selectbox("Month", ["January", "February", "March", "April", "May", "June", "July", "August", "September", "October", "November", "December"], index=get_now().month-1)
         s_v_tier = f3.selectbox("Valuation Tier", price_tiers_list if price_tiers_list else ["None"])
     
     m_idx = ["January", "February", "March", "April", "May", "June", "July", "August", "September", "October", "November", "December"].index(s_m)+1
-    fs_monthly = dash_sales[(dash_sales["Date"].dt.year == s_y) & (dash_sales["Date"].dt.month == m_idx)]
-    paid_monthly = fs_monthly[(fs_monthly['Payment'] == 'Paid') & (fs_monthly['Profit'] > 0)]
+    fs_monthly = sales_roll.month(s_y, m_idx)
+    paid_monthly = fs_monthly[fs_monthly["paid_n"] > 0]
+    monthly_exp_val = exp_roll.month(s_y, m_idx)["amount"].sum()
     
-    exp_df = st.session_state.expenditures.copy()
-    exp_df["Date"] = pd.to_datetime(exp_df["Date"], errors='coerce')
-    monthly_exp_val = exp_df[(exp_df["Date"].dt.year == s_y) & (exp_df["Date"].dt.month == m_idx)]['Cost'].sum()
-    
-    rev, prof = paid_monthly['Total'].sum(), paid_monthly['Profit'].sum()
+    rev, prof = paid_monthly["paid_revenue"].sum(), paid_monthly["paid_profit"].sum()
     margin = (prof / rev * 100) if rev > 0 else 0
     exp_ratio = (monthly_exp_val / rev * 100) if rev > 0 else 0
 
-    current_stock = st.session_state.stock[st.session_state.stock["Status"] == "In Stock"].groupby("Product Name")["Quantity"].sum().reset_index()
+    current_stock = get_stock_ledger().balances()
     val_df = current_stock.merge(db_df, on="Product Name", how="left")
     total_valuation_cost = (val_df["Quantity"] * val_df["Cost per Unit"].fillna(0)).sum()
     potential_sales_val = (val_df["Quantity"] * val_df[s_v_tier].fillna(0)).sum() if s_v_tier in val_df.columns else 0.0
 
     st.write("### 💎 Financial Overview")
     m1, m2, m3, m4 = st.columns(4)
-    total_paid_rev = dash_sales[dash_sales['Payment'] == 'Paid']['Total'].sum()
-    net_cash = (st.session_state.cash_in['Amount'].sum() + total_paid_rev) - st.session_state.expenditures['Cost'].sum()
+    total_paid_rev = sales_roll.total("paid_total")
+    net_cash = (cash_roll.total("amount") + total_paid_rev) - exp_roll.total("amount")
     m1.metric("Total Net Money (Cash)", f"₱{net_cash:,.2f}"); m2.metric("Monthly Paid Profit", f"₱{prof:,.2f}")
     m3.metric("Profit Margin %", f"{margin:.1f}%"); m4.metric("Expense Ratio", f"{exp_ratio:.1f}%")
 
+    st.write("### 📈 Monthly Trend")
+    trend = pd.concat([sales_roll.monthly()[["paid_revenue", "paid_profit"]], exp_roll.monthly()["amount"].rename("expenses"), cash_roll.monthly()["amount"].rename("cash_in")], axis=1).fillna(0.0).sort_index()
+    trend = trend[[ym <= (s_y, m_idx) for ym in trend.index]].tail(12)
+    if not trend.empty:
+        t_lbl = [f"{int(y)}-{int(m):02d}" for y, m in trend.index]
+        fig = go.Figure()
+        fig.add_bar(x=t_lbl, y=trend["paid_revenue"], name="Paid Revenue"); fig.add_bar(x=t_lbl, y=trend["paid_profit"], name="Paid Profit")
+        fig.add_bar(x=t_lbl, y=trend["expenses"], name="Expenses"); fig.add_scatter(x=t_lbl, y=trend["cash_in"], name="Cash In", mode="lines+markers")
+        fig.update_layout(barmode="group", height=300, margin=dict(l=0, r=0, t=10, b=0), legend=dict(orientation="h"))
+        st.plotly_chart(fig, use_container_width=True)
+
     st.write("### 📦 Stock Valuation")
     v1, v2 = st.columns(2)
     v1.metric("Total Stock Value (Cost)", f"₱{total_valuation_cost:,.2f}")
@@ -267,7 +385,8 @@ if page == "Dashboard":
     with c2:
         if not paid_monthly.empty: 
             st.write("### 🏆 Top Sellers (Paid)")
-            st.table(paid_monthly.groupby("Product")["Qty"].sum().sort_values(ascending=False).head(5))
+            top = paid_monthly[paid_monthly.index != ""]["paid_qty"].rename("Qty").rename_axis("Product")
+            st.table(top.sort_values(ascending=False).head(5))
 
 elif page == "Database":
     st.markdown("<h1>📂 Database</h1>", unsafe_allow_html=True)
@@ -275,19 +394,19 @@ elif page == "Database":
     with c1:
         nt = st.text_input("Tier Name")
         if st.button("Add Tier"): 
-            db_df[nt] = 0.0; save_data(db_df, DB_FILE, sync_name="Database"); st.rerun()
+            db_df[nt] = 0.0; save_data(db_df, DB_FILE, sync_name="Database"); rerun()
     with c2:
         td = st.selectbox("Select Tier to Remove", [""] + price_tiers_list)
         if st.button("Delete Tier") and td: 
-            db_df = db_df.drop(columns=[td]); save_data(db_df, DB_FILE, sync_name="Database"); st.rerun()
-    ed_db = st.data_editor(db_df, use_container_width=True, hide_index=True, num_rows="dynamic", height=600)
-    if not ed_db.equals(db_df): save_data(ed_db, DB_FILE, sync_name="Database"); st.rerun()
+            db_df = db_df.drop(columns=[td]); save_data(db_df, DB_FILE, sync_name="Database"); rerun()
+    ed_db = st.data_editor(db_df, use_container_width=True, hide_index=True, num_rows="dynamic", height=600, key=f"db_ed_{st.session_state.get('editor_epoch', 0)}")
+    if is_edited(ed_db, db_df): save_data(ed_db, DB_FILE, sync_name="Database"); rerun()
 
 elif page == "Inventory":
     st.markdown("<h1>📦 Inventory</h1>", unsafe_allow_html=True)
     cl, cr = st.columns([1, 2.5])
     with cl:
-        sdf = st.session_state.stock[st.session_state.stock["Status"] == "In Stock"].groupby("Product Name")["Quantity"].sum().reset_index().sort_values("Quantity")
+        sdf = get_stock_ledger().balances().sort_values("Quantity")
         sdf["Stat"] = sdf["Quantity"].apply(lambda q: "❌" if q <= 0 else "⚠️" if q < 5 else "✅")
         st.dataframe(sdf, use_container_width=True, hide_index=True, height=600)
     with cr:
@@ -295,24 +414,62 @@ elif page == "Inventory":
         c_date, np, nq, ns = f[0].date_input("Date"), f[1].selectbox("Product", product_list), f[2].number_input("Qty", min_value=1), f[3].selectbox("Status", ["In Stock", "Bought"])
         if f[4].button("➕"):
             nr = pd.DataFrame({"Product Name": [np], "Quantity": [nq], "Status": [ns], "Date": [c_date]})
-            st.session_state.stock = pd.concat([st.session_state.stock, nr], ignore_index=True)
-            save_data(st.session_state.stock, STOCK_FILE, sync_name="Inventory"); st.rerun()
-        ed_s = st.data_editor(st.session_state.stock.copy().iloc[::-1], use_container_width=True, hide_index=True, num_rows="dynamic", height=500)
-        if not ed_s.equals(st.session_state.stock.iloc[::-1]): save_data(ed_s.iloc[::-1], STOCK_FILE, sync_name="Inventory"); st.rerun()
+            before, stock_ledger = storage.table_stamp(STOCK_FILE), get_stock_ledger()
+            st.session_state.stock = storage.add_rows(st.session_state.stock, nr)
+            written = save_data(st.session_state.stock, STOCK_FILE, sync_name="Inventory")
+            # A MERGED SAVE STORED THE LOT UNDER A NEW ID, SO THE LEDGER IS REBUILT FROM THE TABLE INSTEAD
+            if written and written["merged"]: storage.invalidate_cached(STOCK_FILE, commits.LEDGER_KEY)
+            elif written: stock_ledger.receive(st.session_state.stock.index[-1], np, nq, ns); storage.update_cached(STOCK_FILE, commits.LEDGER_KEY, stock_ledger, before)
+            rerun()
+        imp = import_panel("stock", "Stock Lots", products=product_list)
+        if imp:
+            # ONE WRITE AND ONE SYNC FOR THE WHOLE FILE; THE LEDGER RECEIVES EACH NEW LOT
+            rows, src = imp
+            before, stock_ledger = storage.table_stamp(STOCK_FILE), get_stock_ledger()
+            st.session_state.stock = storage.add_rows(st.session_state.stock, rows)
+            written = save_data(st.session_state.stock, STOCK_FILE, sync_name="Inventory")
+            if written and written["merged"]: storage.invalidate_cached(STOCK_FILE, commits.LEDGER_KEY)
+            elif written:
+                new = st.session_state.stock.tail(len(rows))
+                for rid, prod, qty, stat in zip(new.index, new["Product Name"], new["Quantity"], new["Status"]): stock_ledger.receive(rid, prod, qty, stat)
+                storage.update_cached(STOCK_FILE, commits.LEDGER_KEY, stock_ledger, before)
+            if written:
+                log_action(f"📥 Imported {len(rows)} stock lot(s) from {src}.")
+            rerun()
+        s_view, s_key = editor_window("stock", st.session_state.stock, equals={"Product Name": ("Product", product_list)})
+        ed_s = st.data_editor(s_view, use_container_width=True, hide_index=True, num_rows="dynamic", column_config={"Date": st.column_config.DateColumn("Date")}, height=500, key=s_key)
+        if is_edited(ed_s, s_view): save_data(paging.merge_window(st.session_state.stock, s_view, ed_s), STOCK_FILE, sync_name="Inventory"); rerun()
+        if st.session_state.role == "Admin" and st.button("🔍 Verify Stock Ledger"):
+            drift = get_stock_ledger().verify(st.session_state.stock)
+            if drift.empty: st.success("Stock ledger matches the stock table.")
+            else:
+                st.warning("Stock ledger drifted from the stock table and was rebuilt."); st.dataframe(drift, hide_index=True)
+                storage.invalidate_cached(STOCK_FILE, commits.LEDGER_KEY)
 
 elif page == "Sales":
     st.markdown("<h1>💰 Sales Tracker</h1>", unsafe_allow_html=True)
+    price_index = storage.cached_table(DB_FILE, lambda: pricing.PriceIndex(db_df, price_tiers_list), key=("price_index",), copy=False)
     with st.container(border=True):
         sf = st.columns([1, 1.2, 1.5, 0.8, 1, 0.5])
         s_date, s_cust, s_prod, s_qty, s_tier = sf[0].date_input("Date"), sf[1].text_input("Customer"), sf[2].selectbox("Product", [""]+product_list), sf[3].number_input("Qty", min_value=1), sf[4].selectbox("Tier", [""]+price_tiers_list)
         if sf[5].button("➕"):
             if s_prod and s_tier:
-                match = db_df[db_df["Product Name"] == s_prod]
-                u_c, b_c, u_p = float(match["Cost per Unit"].values[0]), float(match["Boxed Cost"].values[0]), float(match[s_tier].values[0])
-                calc_tot = u_p * s_qty
-                new_row = pd.DataFrame([{"Date": s_date, "Customer": s_cust, "Product": s_prod, "Qty": s_qty, "Price Tier": s_tier, "Price Value": u_p, "Cost": u_c, "Boxed Cost": b_c, "Profit": calc_tot - (b_c * s_qty), "Discount": 0.0, "Total": calc_tot, "Status": "Pending", "Payment": "Unpaid"}])
-                st.session_state.sales = pd.concat([st.session_state.sales, new_row], ignore_index=True)
-                save_data(st.session_state.sales, SALES_FILE, sync_name="Sales"); st.rerun()
+                new_row = pd.DataFrame([{"Date": s_date, "Customer": s_cust, "Product": s_prod, "Qty": s_qty, "Price Tier": s_tier, "Price Value": 0.0, "Cost": 0.0, "Boxed Cost": 0.0, "Profit": 0.0, "Discount": 0.0, "Total": 0.0, "Status": "Pending", "Payment": "Unpaid"}])
+                new_row = pricing.reprice(new_row, price_index)
+                st.session_state.sales = storage.add_rows(st.session_state.sales, new_row)
+                save_rolled("sales", st.session_state.sales, new_rows=st.session_state.sales.tail(1), sync_name="Sales"); rerun()
+
+    imp = import_panel("sales", "Sales", products=product_list, index=price_index)
+    if imp:
+        # PRICED IN ONE LOOKUP; ONCE THE SALES ARE STORED, ROWS IMPORTED AS SOLD TAKE THEIR FIFO DEDUCTION IN ONE STOCK WRITE
+        rows, src = imp
+        rows = rows.reindex(columns=SALES_ORDER)
+        sold = rows[rows["Status"] == "Sold"]
+        st.session_state.sales = storage.add_rows(st.session_state.sales, rows)
+        if save_rolled("sales", st.session_state.sales, new_rows=st.session_state.sales.tail(len(rows)), sync_name="Sales"):
+            if not sold.empty: deduct_stock(list(zip(sold["Product"], sold["Qty"].astype(int))))
+            log_action(f"📥 Imported {len(rows)} sale(s) from {src} ({len(sold)} sold, ₱{rows['Total'].sum():,.2f}).")
+        rerun()
 
     conf = {
         "Date": st.column_config.DateColumn("Date", required=True),
@@ -323,35 +480,18 @@ elif page == "Sales":
         "Cost": st.column_config.NumberColumn(disabled=True, format="₱%.2f"),
         "Total": st.column_config.NumberColumn(disabled=True, format="₱%.2f")
     }
-    view = st.session_state.sales[SALES_ORDER].copy().iloc[::-1]
-    for c in ["Qty", "Discount", "Price Value", "Cost", "Boxed Cost", "Profit", "Total"]:
-        if c in view.columns: view[c] = pd.to_numeric(view[c], errors='coerce').fillna(0.0)
+    s_win, s_key = editor_window("sales", st.session_state.sales, equals={"Product": ("Product", product_list)}, contains={"Customer": "Customer"})
+    view = s_win[SALES_ORDER].copy()
 
-    ed_sales = st.data_editor(view, use_container_width=True, hide_index=True, num_rows="dynamic", column_config=conf, height=600)
+    ed_sales = st.data_editor(view, use_container_width=True, hide_index=True, num_rows="dynamic", column_config=conf, height=600, key=s_key)
     
-    if not ed_sales.equals(view):
-        ndf = ed_sales.copy()
-        for idx in ndf.index:
-            row = ndf.loc[idx]
-            old_row = view.loc[idx] if idx in view.index else None
-            prod, tier = row["Product"], row["Price Tier"]
-            if prod and tier:
-                match = db_df[db_df["Product Name"] == prod]
-                if not match.empty:
-                    u_c, b_c, u_p = float(match["Cost per Unit"].values[0]), float(match["Boxed Cost"].values[0]), float(match[tier].values[0])
-                    qty, disc = float(row["Qty"]), float(row["Discount"])
-                    tot, prf = (u_p - disc) * qty, ((u_p - disc) * qty) - (b_c * qty)
-                    ndf.at[idx, "Price Value"], ndf.at[idx, "Cost"], ndf.at[idx, "Boxed Cost"], ndf.at[idx, "Total"], ndf.at[idx, "Profit"] = u_p, u_c, b_c, tot, prf
-            if old_row is not None and row["Status"] == "Sold" and old_row["Status"] != "Sold":
-                s_df = st.session_state.stock.copy()
-                mask = (s_df["Product Name"] == prod) & (s_df["Status"] == "In Stock") & (s_df["Quantity"] > 0)
-                available, needed = s_df[mask].index, int(row["Qty"])
-                for s_idx in available:
-                    if needed <= 0: break
-                    take = min(needed, s_df.at[s_idx, "Quantity"])
-                    s_df.at[s_idx, "Quantity"] -= take; needed -= take
-                st.session_state.stock = s_df; save_data(s_df, STOCK_FILE, sync_name="Inventory")
-        save_data(ndf.iloc[::-1], SALES_FILE, sync_name="Sales"); st.rerun()
+    if is_edited(ed_sales, view):
+        # ONLY ROWS THAT WERE ADDED OR EDITED ARE REPRICED AND CHECKED FOR A STATUS FLIP
+        # THE SALES ARE STORED FIRST; FIFO DEDUCTIONS FOR EVERY NEWLY SOLD ROW ARE THEN PLANNED ON THE LEDGER AND WRITTEN ONCE
+        try: written, s_df = store.commit_sales_edit(st.session_state.sales, view, ed_sales, price_index, SALES_FILE, STOCK_FILE, base=base_version(st.session_state.sales, SALES_FILE))
+        except storage.WriteConflict as e: clashed(e)
+        else: saved(written, SALES_FILE); stock_deducted(s_df)
+        rerun()
 
 elif page == "Expenditures":
     st.markdown("<h1>💸 Expenditures</h1>", unsafe_allow_html=True)
@@ -360,23 +500,34 @@ elif page == "Expenditures":
         ex_d, it, ct = st.date_input("Ex Date"), st.text_input("Ex Item"), st.number_input("Ex Cost", min_value=0.0)
         if st.button("Add Expense"):
             new = pd.DataFrame({"Date": [ex_d], "Item": [it], "Cost": [ct]})
-            st.session_state.expenditures = pd.concat([st.session_state.expenditures, new]); save_data(st.session_state.expenditures, EXPENSE_FILE, sync_name="Expenses"); st.rerun()
+            st.session_state.expenditures = storage.add_rows(st.session_state.expenditures, new); save_rolled("expenditures", st.session_state.expenditures, new_rows=st.session_state.expenditures.tail(1), sync_name="Expenses"); rerun()
     with c2:
         in_d, src, amt = st.date_input("Dep Date"), st.text_input("Dep Source"), st.number_input("Dep Amount", min_value=0.0)
         if st.button("Add Deposit"):
             new = pd.DataFrame({"Date": [in_d], "Source": [src], "Amount": [amt]})
-            st.session_state.cash_in = pd.concat([st.session_state.cash_in, new]); save_data(st.session_state.cash_in, CASH_FILE, sync_name="CashIn"); st.rerun()
+            st.session_state.cash_in = storage.add_rows(st.session_state.cash_in, new); save_rolled("cash_in", st.session_state.cash_in, new_rows=st.session_state.cash_in.tail(1), sync_name="CashIn"); rerun()
+    ic1, ic2 = st.columns(2)
+    for col, kind, key, label, sheet in [(ic1, "expenditures", "expenditures", "Expenses", "Expenses"), (ic2, "cash_in", "cash_in", "Deposits", "CashIn")]:
+        with col: imp = import_panel(kind, label)
+        if imp:
+            rows, src = imp
+            st.session_state[key] = storage.add_rows(st.session_state[key], rows)
+            if save_rolled(key, st.session_state[key], new_rows=st.session_state[key].tail(len(rows)), sync_name=sheet):
+                log_action(f"📥 Imported {len(rows)} {label.lower()} from {src}.")
+            rerun()
     l, r = st.columns(2)
     with l:
-        ed_ex = st.data_editor(st.session_state.expenditures.copy().iloc[::-1], use_container_width=True, hide_index=True, num_rows="dynamic", height=500)
-        if not ed_ex.equals(st.session_state.expenditures.iloc[::-1]): save_data(ed_ex.iloc[::-1], EXPENSE_FILE, sync_name="Expenses"); st.rerun()
+        x_view, x_key = editor_window("exp", st.session_state.expenditures, contains={"Item": "Item"})
+        ed_ex = st.data_editor(x_view, use_container_width=True, hide_index=True, num_rows="dynamic", column_config={"Date": st.column_config.DateColumn("Date")}, height=500, key=x_key)
+        if is_edited(ed_ex, x_view): save_rolled("expenditures", paging.merge_window(st.session_state.expenditures, x_view, ed_ex), *rollups.edit_delta(x_view, ed_ex), sync_name="Expenses"); rerun()
     with r:
-        ed_in = st.data_editor(st.session_state.cash_in.copy().iloc[::-1], use_container_width=True, hide_index=True, num_rows="dynamic", height=500)
-        if not ed_in.equals(st.session_state.cash_in.iloc[::-1]): save_data(ed_in.iloc[::-1], CASH_FILE, sync_name="CashIn"); st.rerun()
+        i_view, i_key = editor_window("cash", st.session_state.cash_in, contains={"Source": "Source"})
+        ed_in = st.data_editor(i_view, use_container_width=True, hide_index=True, num_rows="dynamic", column_config={"Date": st.column_config.DateColumn("Date")}, height=500, key=i_key)
+        if is_edited(ed_in, i_view): save_rolled("cash_in", paging.merge_window(st.session_state.cash_in, i_view, ed_in), *rollups.edit_delta(i_view, ed_in), sync_name="CashIn"); rerun()
 
 elif page == "Admin" and st.session_state.role == "Admin":
     st.markdown("<h1>🛡️ Admin Control</h1>", unsafe_allow_html=True)
-    t1, t2 = st.tabs(["Requests", "Cloud Sync Hub"])
+    t1, t2, t3, t4, t5 = st.tabs(["Requests", "Cloud Sync Hub", "Performance", "Backups", "Memory"])
     with t1:
         pend = users_df[users_df['Status'] == "Pending"]
         for idx, row in pend.iterrows():
@@ -384,26 +535,120 @@ elif page == "Admin" and st.session_state.role == "Admin":
                 c1, c2, c3 = st.columns([2, 1, 1])
                 c1.write(f"User: **{row['Username']}**")
                 if c2.button(f"Approve", key=f"app_{idx}"):
-                    users_df.at[idx, 'Status'] = "Approved"; save_data(users_df, USERS_FILE, sync_name="Users"); st.rerun()
+                    users_df = users_df.copy(); users_df.at[idx, 'Status'] = "Approved"; save_data(users_df, USERS_FILE, sync_name="Users"); rerun()
                 if c3.button(f"Reject", key=f"rej_{idx}"):
-                    save_data(users_df.drop(idx), USERS_FILE, sync_name="Users"); st.rerun()
+                    save_data(users_df.drop(idx), USERS_FILE, sync_name="Users"); rerun()
     with t2:
+        # PUSHES ARE READ FROM STORAGE BY THE WORKER, UP TO cloud_sync.SYNC_THREADS SHEETS AT A TIME IN CHUNKS
         if st.button("🚀 Push All Data to Google Sheets"):
-            sync_to_google(st.session_state.inventory, "Database"); sync_to_google(st.session_state.stock, "Inventory")
-            sync_to_google(st.session_state.sales, "Sales"); sync_to_google(st.session_state.expenditures, "Expenses")
-            sync_to_google(st.session_state.cash_in, "CashIn"); sync_to_google(users_df, "Users")
-            st.success("Cloud Backup Complete!")
+            for sheet in SHEET_FILES: sync_worker.enqueue(sheet, None)
+            st.success("Cloud backup queued. Progress is shown below and under Cloud Sync in the sidebar.")
+        if st.button("🔍 Verify Cloud Copy"):
+            for sheet in SHEET_FILES: sync_worker.enqueue(sheet, None, verify=True)
+            st.success("Verification queued. Drifted sheets will be fully re-uploaded.")
+        pull_ok = st.checkbox("Replace the local data with the Google Sheets copy (the local data is snapshotted first)")
+        if st.button("📥 Pull All From Google Sheets", disabled=not pull_ok):
+            backup_store.snapshot()
+            with st.spinner("Downloading sheets..."):
+                pulled = cloud_sync.pull_all(GSHEET_API_URL, list(SHEET_FILES), fetch=fetch_from_google)
+            done, failed = [], []
+            for sheet, df in pulled.items():
+                if isinstance(df, Exception) or df.empty: failed.append(sheet); continue
+                storage.write_table(df, SHEET_FILES[sheet]); sync_worker.adopt(sheet, df); done.append(sheet)
+            if failed: st.session_state.flash = f"⚠️ Not pulled (unreachable or empty): {', '.join(failed)}. Local copies were kept."
+            if done: log_action(f"📥 Pulled {', '.join(done)} from Google Sheets.")
+            rerun()
+        ss = sync_worker.status()
+        if ss["running"]: st.button("🔄 Refresh Progress")
+        for sheet, (sent, total) in ss["progress"].items():
+            st.progress(sent / total if total else 0.0, text=f"⬆️ {sheet}: {sent:,} / {total:,} rows")
+        st.caption(f"Pushes sent: {ss['sent']} · Full uploads: {ss['full_pushes']} · Delta rows: {ss['delta_rows']} · Chunks: {ss['chunks']} · Drift resyncs: {ss['drift_resyncs']}")
+    with t3:
+        # ROLLING WINDOW OF PER-RERUN TIMINGS FROM EVERY SESSION OF THIS PROCESS (SEE perf.py)
+        perf_df = perf.entries()
+        st.caption(f"Last {perf.WINDOW_SECONDS // 60} minutes · render = script time outside load/save/sync/diff")
+        if perf_df.empty: st.info("No measurements yet.")
+        else:
+            pc = st.columns(2)
+            p_page = pc[0].selectbox("Page", ["All"] + sorted(perf_df["Page"].unique()), key="perf_page")
+            p_user = pc[1].selectbox("User", ["All"] + sorted(perf_df["User"].unique()), key="perf_user")
+            if p_page != "All": perf_df = perf_df[perf_df["Page"] == p_page]
+            if p_user != "All": perf_df = perf_df[perf_df["User"] == p_user]
+            runs = perf_df.loc[perf_df["Op"] == "rerun", "Seconds"] * 1000
+            m1, m2, m3 = st.columns(3)
+            m1.metric("Reruns", f"{len(runs):,}"); m2.metric("Mean Rerun", f"{runs.mean() if len(runs) else 0:,.1f} ms"); m3.metric("p95 Rerun", f"{runs.quantile(0.95) if len(runs) else 0:,.1f} ms")
+            st.dataframe(perf.summary(perf_df).sort_values("Total ms", ascending=False), use_container_width=True, hide_index=True,
+                         column_config={c: st.column_config.NumberColumn(format="%.2f") for c in ["Total ms", "Mean ms", "p95 ms", "MB"]})
+            st.download_button("⬇️ Export CSV", perf_df.to_csv(index=False).encode("utf-8"), file_name=f"performance_{get_now().strftime('%Y%m%d_%H%M')}.csv", mime="text/csv")
+    with t4:
+        # SNAPSHOTS ONLY RE-READ TABLES THAT CHANGED AND NEVER STORE THE SAME CONTENT TWICE (SEE backups.py)
+        snaps = backup_store.list()
+        b1, b2, b3 = st.columns(3)
+        b1.metric("Snapshots", len(snaps)); b2.metric("Stored", f"{backup_store.size() / 1048576:,.1f} MB")
+        b3.metric("Last Snapshot", snaps[0]["created"].replace("T", " ") if snaps else "Never")
+        sched = backup_store.scheduler
+        if sched is None: st.caption("🕒 Automatic snapshots are off (INV_PRO_BACKUP_INTERVAL is 0).")
+        else:
+            ran = sched.last_run.astimezone(MANILA_TZ).strftime("%I:%M %p") if sched.last_run else "not yet"
+            st.caption(f"🕒 Automatic snapshot every {sched.interval // 60} min · last check: {ran}"
+                       + (f" · last automatic snapshot: {sched.last_snapshot.replace('T', ' ')}" if sched.last_snapshot else ""))
+            if sched.last_error: st.caption(f"⚠️ {sched.last_error}")
+        st.caption("The activity log is not part of snapshots: it is append-only and kept on the Logs sheet.")
+        bc = st.columns(2)
+        if bc[0].button("📸 Snapshot Now"):
+            snap = backup_store.snapshot(force=True); log_action(f"📸 Snapshot {snap['id']} taken."); st.success(f"Snapshot saved ({len(snap['changed'])} table(s) changed).")
+            snaps = backup_store.list()
+        if bc[1].button("🧹 Apply Retention"): st.success(f"Removed {backup_store.prune()} old snapshot(s)."); snaps = backup_store.list()
+        if snaps:
+            st.dataframe(pd.DataFrame([{"Created": m["created"].replace("T", " "), "Changed": ", ".join(storage.table_name(f) for f in m.get("changed", [])),
+                                        "Rows": sum(e["rows"] for e in m["tables"].values())} for m in snaps]), use_container_width=True, hide_index=True, height=250)
+            st.write("#### ⏪ Point-in-Time Restore")
+            # THE NEWEST SNAPSHOT AT OR BEFORE THE CHOSEN MINUTE (SNAPSHOT TIMES ARE THE SERVER'S CLOCK)
+            rc = st.columns([1, 1, 2])
+            created = {m["id"]: m["created"].replace("T", " ") for m in snaps}
+            r_day = rc[0].date_input("Restore As Of", value=datetime.now().date(), key="restore_day")
+            r_time = rc[1].time_input("Time", value=datetime.now().time().replace(second=0, microsecond=0), key="restore_time")
+            r_snap = backup_store.at(datetime.combine(r_day, r_time.replace(second=59, microsecond=999999)))
+            if r_snap is None: st.caption("No snapshot was taken at or before that time.")
+            else:
+                r_id = r_snap["id"]
+                st.caption(f"Uses the snapshot taken {created[r_id]}.")
+                r_tables = [f for f in BACKUP_FILES if f in r_snap["tables"]]
+                r_files = rc[2].multiselect("Tables", r_tables, default=r_tables, format_func=storage.table_name)
+                r_ok = st.checkbox("Replace the current data with this snapshot (the current data is snapshotted first)")
+                if st.button("⏪ Restore", disabled=not (r_ok and r_files)):
+                    done = backup_store.restore(r_id, r_files)
+                    for sheet, f in SHEET_FILES.items():
+                        if f in done: sync_worker.enqueue(sheet, None)
+                    log_action(f"⏪ Restored {', '.join(storage.table_name(f) for f in done)} to {created[r_id]}."); rerun()
+        st.write("#### 📥 Excel Export")
+        if backups.xlsxwriter is None: st.caption("Install xlsxwriter to enable Excel export.")
+        elif st.button("📦 Build Excel Workbook"):
+            with st.spinner("Writing workbook..."): st.session_state.export_xlsx = backups.export_bytes({s: f for s, f in SHEET_FILES.items() if f != USERS_FILE})
+        if "export_xlsx" in st.session_state:
+            st.download_button("⬇️ Download Workbook", st.session_state.export_xlsx, file_name=f"inventory_pro_{get_now().strftime('%Y%m%d_%H%M')}.xlsx",
+                               mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", on_click=lambda: st.session_state.pop("export_xlsx", None))
+    with t5:
+        # TABLES IN THE SHARED CACHE ARE HELD ONCE PER PROCESS; SESSIONS ONLY KEEP SHALLOW VIEWS OF THEM
+        mem = pd.DataFrame([{"Table": storage.table_name(f), "Rows": len(df), "Columns": len(df.columns),
+                             "Categorical": sum(isinstance(t, pd.CategoricalDtype) for t in df.dtypes),
+                             "Memory (MB)": schema.footprint(df) / 1048576} for f, k, df in storage.cached_frames()])
+        if not mem.empty:
+            st.metric("Shared Table Memory", f"{mem['Memory (MB)'].sum():,.2f} MB")
+            st.dataframe(mem.sort_values("Memory (MB)", ascending=False), use_container_width=True, hide_index=True, column_config={"Memory (MB)": st.column_config.NumberColumn(format="%.3f")})
 
 elif page == "Log":
     st.markdown("<h1>📜 Activity Log</h1>", unsafe_allow_html=True)
-    log_data = load_data(LOG_FILE, {})
-    if not log_data.empty:
-        log_data['User'] = log_data['Identity'].str.split(' (', regex=False).str[0]
-        user_list = ["All Users"] + sorted(log_data['User'].unique().tolist())
-        selected_user = st.selectbox("Filter Logs by Staff Member", user_list)
-        display_data = log_data[log_data['User'] == selected_user].drop(columns=['User']) if selected_user != "All Users" else log_data.drop(columns=['User'])
-    else:
-        display_data = log_data
+    lf = st.columns([2, 1, 1])
+    selected_user = lf[0].selectbox("Filter Logs by Staff Member", ["All Users"] + action_log.users())
+    log_user = None if selected_user == "All Users" else selected_user
+    log_size = lf[1].selectbox("Rows per Page", [50, 100, 250, 500], index=1)
+    log_pages = max(1, -(-action_log.count(log_user) // log_size))
+    log_page = lf[2].number_input(f"Page (of {log_pages})", min_value=1, max_value=log_pages, value=1)
+    display_data, log_total = action_log.read_page(log_page - 1, log_size, log_user)
+    st.caption(f"{log_total:,} entries · newest first")
     st.dataframe(display_data, use_container_width=True, hide_index=True, height=700)
     if st.session_state.role == "Admin" and st.button("⚠️ Clear Activity Log"):
-        save_data(pd.DataFrame(columns=["Timestamp", "Identity", "Action Detail"]), LOG_FILE, sync_name="Logs"); st.rerun()
+        action_log.clear(); sync_worker.reset("Logs"); rerun()
+
+perf.finish()
@@ -0,0 +1,206 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import storage
+
+try: import xlsxwriter
+except ImportError: xlsxwriter = None
+
+# --- SNAPSHOT CONFIG ---
+# backups/objects/<sha256>.csv.gz   one gzipped CSV per distinct table content (row ids in "_rid")
+# backups/snapshots/<stamp>.json    manifest: {"created", "tables": {file: {"object", "rows", "version"}}}
+# A snapshot re-reads only the tables whose stored version moved since the previous snapshot, and
+# content that is already stored (e.g. a table edited and then changed back) is not written again.
+BACKUP_DIR = os.environ.get("INV_PRO_BACKUP_DIR", "backups")
+INTERVAL = int(os.environ.get("INV_PRO_BACKUP_INTERVAL", 3600))
+KEEP_LAST = int(os.environ.get("INV_PRO_BACKUP_KEEP_LAST", 24))
+KEEP_DAILY = int(os.environ.get("INV_PRO_BACKUP_KEEP_DAILY", 14))
+KEEP_WEEKLY = int(os.environ.get("INV_PRO_BACKUP_KEEP_WEEKLY", 8))
+ROW_KEY = "_rid"
+EXCEL_MAX_ROWS = 1048575  # data rows per worksheet below the header
+
+def _json_version(v): return list(v) if isinstance(v, tuple) else v
+
+class SnapshotStore:
+    def __init__(self, files, root=BACKUP_DIR):
+        self.files, self.root = list(files), root
+        self.objects, self.snapshots = os.path.join(root, "objects"), os.path.join(root, "snapshots")
+        self.lock, self.scheduler = threading.Lock(), None
+        os.makedirs(self.objects, exist_ok=True); os.makedirs(self.snapshots, exist_ok=True)
+
+    def _object_path(self, digest): return os.path.join(self.objects, digest + ".csv.gz")
+
+    def list(self):
+        """Returns the manifests, newest first, each with its "id"."""
+        out = []
+        for name in sorted(os.listdir(self.snapshots), reverse=True):
+            if not name.endswith(".json"): continue
+            try:
+                with open(os.path.join(self.snapshots, name)) as f: m = json.load(f)
+            except (OSError, ValueError): continue
+            m["id"] = name[:-5]; out.append(m)
+        return out
+
+    def _store(self, df):
+        raw = df.to_csv(index=True, index_label=ROW_KEY).encode("utf-8")
+        digest = hashlib.sha256(raw).hexdigest()
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            with gzip.open(path + ".tmp", "wb", compresslevel=6) as f: f.write(raw)
+            os.replace(path + ".tmp", path)
+        return digest
+
+    def snapshot(self, force=False):
+        """Captures every table whose version changed since the last snapshot. Returns the new
+        manifest, or None when nothing changed (unless force)."""
+        with self.lock:
+            last = next(iter(self.list()), None)
+            prev = last["tables"] if last else {}
+            tables, changed = {}, []
+            for file in self.files:
+                version = _json_version(storage.get_backend().stamp(file))
+                if version is None: continue
+                old = prev.get(file)
+                if old is not None and old["version"] == version and os.path.exists(self._object_path(old["object"])):
+                    tables[file] = old; continue
+                df = storage.read_table(file)
+                if df is None: continue
+                digest = self._store(df)
+                tables[file] = {"object": digest, "rows": len(df), "version": version}
+                if old is None or old["object"] != digest: changed.append(file)
+            if not changed and not force and last is not None: return None
+            now = datetime.now()
+            manifest = {"created": now.isoformat(timespec="seconds"), "tables": tables, "changed": changed}
+            sid = now.strftime("%Y%m%d-%H%M%S-%f")
+            tmp = os.path.join(self.snapshots, sid + ".json.tmp")
+            with open(tmp, "w") as f: json.dump(manifest, f)
+            os.replace(tmp, os.path.join(self.snapshots, sid + ".json"))
+            manifest["id"] = sid
+            return manifest
+
+    def load(self, snapshot_id, file):
+        """Returns one table as it was in a snapshot, with its original row ids."""
+        with open(os.path.join(self.snapshots, snapshot_id + ".json")) as f: entry = json.load(f)["tables"][file]
+        df = pd.read_csv(self._object_path(entry["object"]), index_col=ROW_KEY, compression="gzip")
+        df.index.name = None
+        return df
+
+    def at(self, when):
+        """The newest snapshot taken at or before `when` (point-in-time lookup), or None."""
+        stamp = pd.Timestamp(when)
+        return next((m for m in self.list() if pd.Timestamp(m["created"]) <= stamp), None)
+
+    def restore(self, snapshot_id, files=None):
+        """Writes the snapshot's tables back as the current data, after snapshotting the current
+        state so the restore itself can be undone. Returns the restored files."""
+        self.snapshot()
+        with open(os.path.join(self.snapshots, snapshot_id + ".json")) as f: tables = json.load(f)["tables"]
+        done = []
+        for file in files or list(tables):
+            if file not in tables: continue
+            storage.write_table(self.load(snapshot_id, file), file); done.append(file)
+        return done
+
+    def prune(self, keep_last=KEEP_LAST, keep_daily=KEEP_DAILY, keep_weekly=KEEP_WEEKLY):
+        """Applies the retention policy (newest keep_last, plus the newest snapshot of each of the
+        last keep_daily days and keep_weekly ISO weeks) and deletes objects no snapshot uses."""
+        with self.lock:
+            snaps = self.list()
+            keep, days, weeks = {m["id"] for m in snaps[:keep_last]}, set(), set()
+            for m in snaps:
+                t = datetime.fromisoformat(m["created"])
+                day, week = t.date(), tuple(t.isocalendar())[:2]
+                if day not in days and len(days) < keep_daily: days.add(day); keep.add(m["id"])
+                if week not in weeks and len(weeks) < keep_weekly: weeks.add(week); keep.add(m["id"])
+            removed = [m for m in snaps if m["id"] not in keep]
+            for m in removed: os.remove(os.path.join(self.snapshots, m["id"] + ".json"))
+            used = {e["object"] for m in snaps if m["id"] in keep for e in m["tables"].values()}
+            for name in os.listdir(self.objects):
+                if name.endswith(".csv.gz") and name[:-7] not in used: os.remove(os.path.join(self.objects, name))
+            return len(removed)
+
+    def size(self):
+        return sum(os.path.getsize(os.path.join(self.objects, n)) for n in os.listdir(self.objects))
+
+# --- SCHEDULER ---
+class BackupScheduler:
+    """Takes a snapshot and prunes every `interval` seconds on a daemon thread."""
+
+    def __init__(self, store, interval=INTERVAL):
+        self.store, self.interval = store, interval
+        self.last_run, self.last_snapshot, self.last_error = None, None, None
+        self.thread = threading.Thread(target=self._run, name="backup-snapshots", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                m = self.store.snapshot()
+                if m is not None: self.last_snapshot = m["created"]
+                self.store.prune(); self.last_error = None
+            except Exception as e: self.last_error = str(e)
+            self.last_run = datetime.now()
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_store(files, interval=INTERVAL):
+    """Returns the process-wide snapshot store and starts its scheduler (interval <= 0 keeps snapshots manual)."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                store = SnapshotStore(files)
+                if interval > 0: store.scheduler = BackupScheduler(store, interval)
+                _store = store
+    return _store
+
+# --- EXCEL EXPORT ---
+def export_excel(target, sheets, chunk_size=50000):
+    """Streams tables into one workbook with xlsxwriter's constant_memory mode: each row is flushed
+    to disk as it is written, so memory stays at one chunk regardless of table size. `sheets` maps
+    sheet name -> data file; sheets past Excel's row limit continue on "<name> (2)" and so on.
+    Returns {sheet: rows written}."""
+    if xlsxwriter is None: raise RuntimeError("xlsxwriter is not installed")
+    wb = xlsxwriter.Workbook(target, {"constant_memory": True, "nan_inf_to_errors": True})
+    date_fmt = wb.add_format({"num_format": "yyyy-mm-dd"})
+    head_fmt = wb.add_format({"bold": True})
+    written = {}
+    try:
+        for name, file in sheets.items():
+            ws, part, row, total, cols = None, 1, 0, 0, None
+            for df in storage.iter_table(file, chunk_size):
+                if cols is None: cols = list(df.columns)
+                if "Date" in df.columns: df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
+                for rec in df.itertuples(index=False, name=None):
+                    if ws is None or row > EXCEL_MAX_ROWS:
+                        ws = wb.add_worksheet((name if part == 1 else f"{name} ({part})")[:31]); part += 1; row = 1
+                        ws.write_row(0, 0, cols, head_fmt)
+                    for c, v in enumerate(rec):
+                        if v is None or v is pd.NaT or (isinstance(v, float) and v != v): continue
+                        if isinstance(v, datetime): ws.write_datetime(row, c, v.to_pydatetime() if isinstance(v, pd.Timestamp) else v, date_fmt)
+                        elif isinstance(v, (int, float, np.integer, np.floating)) and not isinstance(v, bool): ws.write_number(row, c, float(v))
+                        else: ws.write(row, c, v if isinstance(v, (str, bool)) else str(v))
+                    row += 1; total += 1
+            if ws is None: wb.add_worksheet(name[:31])
+            written[name] = total
+    finally: wb.close()
+    return written
+
+def export_bytes(sheets, chunk_size=50000):
+    """export_excel into a temporary file under BACKUP_DIR, returned as bytes for a download button."""
+    os.makedirs(BACKUP_DIR, exist_ok=True)
+    path = os.path.join(BACKUP_DIR, f"export-{os.getpid()}-{threading.get_ident()}.xlsx")
+    try:
+        export_excel(path, sheets, chunk_size)
+        with open(path, "rb") as f: return f.read()
+    finally:
+        try: os.remove(path)
+        except OSError: pass
@@ -0,0 +1,376 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import activity_log
+import bench_data
+import cloud_sync
+import commits
+import gsheet_stub
+import paging
+import pricing
+import rollups
+import schema
+import storage
+
+# --- HEADLESS BENCHMARKS ---
+# Times the code paths behind app.py's load_data, save_data, log_action, the Sales editor block,
+# the Dashboard figures and sync_to_google, on synthetic data, without a browser:
+#   python bench.py --scales 10k,100k [--backend sqlite|csv] [--stress 8] [--out report.json] [--compare old.json]
+# Each scale runs in a fresh temporary directory. The JSON report holds the environment plus one
+# record per (case, scale); --compare prints median ratios against an older report and exits 1
+# when any case got slower than --max-ratio. The stress and sync cases also check the resulting
+# tables and stub sheets, and any mismatch fails the run with exit code 2.
+SCHEMA_NAMES = {"inventory": "inventory", "stock": "stock", "sales": "sales", "expenditures": "expenditures", "cash_in": "cash_in"}
+
+def measure(fn, repeat=3, setup=None):
+    """Runs setup() (untimed) then fn(state) `repeat` times; returns (seconds per run, last result)."""
+    times, out = [], None
+    for _ in range(repeat):
+        state = setup() if setup else None
+        t0 = time.perf_counter()
+        out = fn(state) if setup else fn()
+        times.append(time.perf_counter() - t0)
+    return times, out
+
+class Report:
+    def __init__(self, meta):
+        self.meta, self.results, self.failures = meta, [], []
+
+    def add(self, case, scale, times, ops=1, **extra):
+        rec = {"case": case, "scale": scale, "runs": len(times), "min_s": min(times), "median_s": statistics.median(times),
+               "mean_s": statistics.fmean(times), "ops": ops, "per_op_ms": statistics.median(times) / ops * 1000}
+        rec.update(extra)
+        self.results.append(rec)
+        print(f"  {case:<28} {rec['median_s'] * 1000:>10.2f} ms" + (f"  ({rec['per_op_ms']:.3f} ms/op)" if ops > 1 else ""), flush=True)
+        return rec
+
+    def save(self, path):
+        with open(path, "w") as f: json.dump({"meta": self.meta, "results": self.results, "failures": self.failures}, f, indent=1, default=str)
+
+def environment(args):
+    try: commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError: commit = None
+    return {"timestamp": datetime.now().isoformat(timespec="seconds"), "commit": commit, "python": platform.python_version(),
+            "pandas": pd.__version__, "numpy": np.__version__, "platform": platform.platform(), "backend": args.backend,
+            "seed": args.seed, "tiers": args.tiers, "repeat": args.repeat}
+
+def drain(worker, sent_before, timeout=600, retries=False):
+    """Blocks until the worker's queue is empty after at least one more successful push."""
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        s = worker.status()
+        if s["depth"] == 0 and s["sent"] > sent_before: return s
+        if s["retrying"] and not retries: raise RuntimeError(f"sync failed: {s['last_error']}")
+        time.sleep(0.002)
+    raise TimeoutError("sync queue did not drain")
+
+# --- CASES ---
+def run_scale(report, scale, args):
+    print(f"scale {scale:,} ({args.backend})", flush=True)
+    times, data = measure(lambda: bench_data.generate(scale, n_tiers=args.tiers, seed=args.seed), repeat=1)
+    report.add("generate", scale, times, rows=scale)
+    tiers = bench_data.tier_names(args.tiers)
+    storage.use_backend(storage.SQLiteBackend("bench.db") if args.backend == "sqlite" else storage.CSVBackend())
+    files = bench_data.FILES
+    defaults = {k: {c: [] for c in data[k].columns} for k in files}
+
+    def seed_tables():
+        for k, f in files.items(): storage.write_table(data[k], f)
+    times, _ = measure(seed_tables, repeat=1)
+    report.add("seed_write", scale, times, rows=sum(len(data[k]) for k in files))
+
+    # load_data: cold parse + coerce, then the shared-cache hit every later rerun gets; saves go
+    # through the same commits.Store the app uses (write-through cache included), minus the sync
+    store = commits.Store({files[k]: SCHEMA_NAMES[k] for k in files})
+    def load(k): return store.load(files[k], defaults[k])
+    times, sales = measure(lambda _: load("sales"), repeat=args.repeat, setup=storage.clear_cache)
+    report.add("load_data.sales.cold", scale, times, rows=len(sales), bytes=schema.footprint(sales))
+    times, _ = measure(lambda: load("sales"), repeat=args.repeat * 3)
+    report.add("load_data.sales.warm", scale, times)
+    times, _ = measure(lambda _: [load(k) for k in files], repeat=args.repeat, setup=storage.clear_cache)
+    report.add("load_data.all.cold", scale, times)
+    inv, stock = load("inventory"), load("stock")
+
+    # save_data: one appended row and one edited cell on the full sales table
+    rng = np.random.default_rng(args.seed)
+
+    def save(df):
+        nonlocal sales
+        sales = df
+        return store.save(df, files["sales"])
+    times, counts = measure(save, repeat=args.repeat, setup=lambda: storage.add_rows(sales, sales.tail(1)))
+    report.add("save_data.sales.append_one", scale, times, rows=len(sales), written=counts)
+
+    def edited():
+        df = sales.copy(); df.loc[df.index[rng.integers(0, len(df))], "Discount"] += 1.0; return df
+    times, counts = measure(save, repeat=args.repeat, setup=edited)
+    report.add("save_data.sales.edit_one", scale, times, rows=len(sales), written=counts)
+
+    # log_action: O(1) appends onto a log that already holds `scale` rows
+    log = activity_log.ActivityLog(os.path.join(os.getcwd(), "activity_log"))
+    times, _ = measure(lambda: log.import_frame(data["log"]), repeat=1)
+    report.add("log.import", scale, times, rows=len(data["log"]))
+    n = 200
+    times, _ = measure(lambda: [log.append(datetime.now().strftime("%Y-%m-%d %I:%M:%S %p"), "bench", "bench (Admin)", f"bench entry {i}") for i in range(n)], repeat=args.repeat)
+    report.add("log_action", scale, times, ops=n)
+    times, _ = measure(lambda: log.read_page(0, 100), repeat=args.repeat)
+    report.add("log.read_page", scale, times)
+
+    # Sales editor: one page with 3 quantity edits and 5 Pending -> Sold flips, repriced, FIFO-deducted and saved
+    index = pricing.PriceIndex(inv, tiers)
+    sales = load("sales")  # the rerun after the saves above, served by the write-through cache
+    times, _ = measure(lambda: pricing.reprice(sales, index), repeat=args.repeat)
+    report.add("pricing.reprice_all", scale, times, rows=len(sales))
+    times, _ = measure(lambda _: store.stock_ledger(files["stock"]), repeat=args.repeat, setup=lambda: storage.invalidate_cached(files["stock"], commits.LEDGER_KEY))
+    report.add("ledger.rebuild", scale, times, rows=len(stock))
+
+    def editor_round_trip():
+        view = schema.editable(paging.page_rows(sales, 0, 100))
+        ed = view.copy()
+        ed.loc[ed.index[:3], "Qty"] = ed.loc[ed.index[:3], "Qty"] + 1
+        pending = ed.index[ed["Status"] == "Pending"][:5]
+        ed.loc[pending, "Status"] = "Sold"
+        return view, ed
+
+    def sales_editor(state):
+        nonlocal sales
+        view, ed = state
+        written, deducted = store.commit_sales_edit(sales, view, ed, index, files["sales"], files["stock"], base=storage.table_version(sales))
+        if deducted is None: report.failures.append(f"{scale}: the Sales editor's stock deduction clashed on every attempt")
+        sales = load("sales")
+        return written
+    times, _ = measure(sales_editor, repeat=args.repeat, setup=editor_round_trip)
+    report.add("sales_editor.commit", scale, times)
+
+    # Dashboard: rollups built once per table version, then the per-rerun figure math
+    def build():
+        return rollups.sales_rollup(sales), rollups.amount_rollup(load("expenditures"), "Cost"), rollups.amount_rollup(load("cash_in"), "Amount")
+    times, (s_roll, e_roll, c_roll) = measure(build, repeat=args.repeat)
+    report.add("dashboard.build_rollups", scale, times)
+    y, m = (s_roll.years() or [datetime.now().year])[0], 6
+
+    def figures():
+        fs = s_roll.month(y, m); paid = fs[fs["paid_n"] > 0]
+        rev, prof = paid["paid_revenue"].sum(), paid["paid_profit"].sum()
+        bal = store.stock_ledger(files["stock"]).balances().merge(inv, on="Product Name", how="left")
+        val = ((bal["Quantity"] * bal["Cost per Unit"].fillna(0)).sum(), (bal["Quantity"] * bal[tiers[0]].fillna(0)).sum())
+        net = c_roll.total("amount") + s_roll.total("paid_total") - e_roll.total("amount")
+        trend = pd.concat([s_roll.monthly()[["paid_revenue", "paid_profit"]], e_roll.monthly()["amount"].rename("expenses"), c_roll.monthly()["amount"].rename("cash_in")], axis=1).fillna(0.0).sort_index()
+        return rev, prof, val, net, trend[[ym <= (y, m) for ym in trend.index]].tail(12), paid["paid_qty"].sort_values(ascending=False).head(5)
+    times, _ = measure(figures, repeat=args.repeat * 3)
+    report.add("dashboard.figures", scale, times)
+    view, ed = editor_round_trip()
+    old_rows, new_rows = rollups.edit_delta(view, pricing.apply_sales_edit(view, ed, index)[0])
+    sales_editor((view, ed))
+    times, _ = measure(lambda: s_roll.update(old_rows, new_rows), repeat=args.repeat)
+    report.add("dashboard.rollup_update", scale, times)
+
+    if args.stress: stress(report, scale, args, data, load)
+
+    # sync_to_google against the local stub: first full push, a one-row delta, and the log tail; then
+    # Push All / Pull All over every table, serial and with --sync-threads, and a push that resumes
+    # after a failed chunk. The stub rejects requests larger than one chunk, like Apps Script would.
+    if scale > args.sync_max:
+        print(f"  sync cases skipped above --sync-max {args.sync_max:,}", flush=True); return
+    server, url, stub = gsheet_stub.serve(max_rows=args.sync_chunk)
+    cloud_sync.STATE_DIR = os.path.join(os.getcwd(), "sync_state")
+    worker = cloud_sync.SyncWorker(url, queue_file=os.path.join(os.getcwd(), "sync_queue.json"), threads=args.sync_threads, chunk_rows=args.sync_chunk)
+    try:
+        def push(df, sheet="Sales"):
+            sent = worker.status()["sent"]; worker.enqueue(sheet, df); drain(worker, sent)
+        b0 = stub.bytes_in
+        times, _ = measure(lambda: push(sales), repeat=1)
+        report.add("sync.full", scale, times, rows=len(sales), bytes=stub.bytes_in - b0)
+        def next_edit():
+            nonlocal sales
+            sales = edited(); return sales
+        b0 = stub.bytes_in
+        times, _ = measure(push, repeat=args.repeat, setup=next_edit)
+        report.add("sync.delta_one", scale, times, bytes=(stub.bytes_in - b0) // args.repeat)
+        # A push mixing deletes, edits and appends must leave the stub's sheet equal to the local frame
+        # and go out as a delta; a row then lost on the remote side must be caught by verify() and
+        # repaired with a full resync.
+        def matches(sheet, df):
+            with stub.lock: got = sorted(stub.sheets.get(sheet, []), key=lambda r: r["_rid"])
+            return got == sorted(json.loads(json.dumps(cloud_sync.to_keyed_records(df))), key=lambda r: r["_rid"])
+        k = max(1, min(50, len(sales) // 100))
+        mixed = sales.drop(sales.index[:k]).copy()
+        mixed.loc[mixed.index[:k], "Qty"] = mixed.loc[mixed.index[:k], "Qty"] + 1
+        mixed = storage.add_rows(mixed, sales.tail(k))
+        s0 = worker.status()
+        times, _ = measure(lambda: push(mixed), repeat=1)
+        s1 = worker.status()
+        report.add("sync.delta_mixed", scale, times, rows=3 * k)
+        if not matches("Sales", mixed) or s1["delta_rows"] - s0["delta_rows"] != 3 * k or s1["full_pushes"] != s0["full_pushes"]:
+            report.failures.append(f"{scale}: mixed delta push ({k} deletes/edits/appends) left the stub's Sales sheet different from the local frame")
+        sales = mixed
+        with stub.lock: stub.sheets["Sales"].pop(0)
+        def resync():
+            sent = worker.status()["sent"]; worker.enqueue("Sales", sales, verify=True); drain(worker, sent)
+        times, _ = measure(resync, repeat=1)
+        report.add("sync.verify_resync", scale, times, rows=len(sales))
+        if not matches("Sales", sales) or worker.status()["drift_resyncs"] != s1["drift_resyncs"] + 1:
+            report.failures.append(f"{scale}: verify() did not repair a row removed from the stub's Sales sheet")
+        worker.register_tail("Logs", log.rows_since)
+        times, _ = measure(lambda: push(None, "Logs"), repeat=1)
+        report.add("sync.log_full", scale, times, rows=log.count())
+        times, _ = measure(lambda _: push(None, "Logs"), repeat=args.repeat, setup=lambda: log.append("now", "bench", "bench (Admin)", "tail entry"))
+        report.add("sync.log_append", scale, times)
+        tables = {f"All {k}": data[k] for k in bench_data.FILES}
+        for case, threads in (("sync.push_all_serial", 1), ("sync.push_all", args.sync_threads)):
+            bulk = cloud_sync.SyncWorker(url, queue_file=os.path.join(os.getcwd(), f"sync_queue_{threads}.json"), threads=threads, chunk_rows=args.sync_chunk)
+            def push_all():
+                sent = bulk.status()["sent"]
+                for sheet, df in tables.items(): bulk.reset(sheet); bulk.enqueue(sheet, df)
+                drain(bulk, sent)
+            times, _ = measure(push_all, repeat=1)
+            report.add(case, scale, times, rows=sum(len(df) for df in tables.values()), threads=threads)
+        for sheet, df in tables.items():
+            with stub.lock: got = stub.sheets.get(sheet, [])
+            if sorted(r["_rid"] for r in got) != sorted(int(i) for i in df.index): report.failures.append(f"{scale}: push_all left {sheet} with {len(got)} of {len(df)} rows")
+        for case, threads in (("sync.pull_all_serial", 1), ("sync.pull_all", args.sync_threads)):
+            times, pulled = measure(lambda: cloud_sync.pull_all(url, list(tables), threads=threads), repeat=args.repeat)
+            report.add(case, scale, times, rows=sum(len(df) for df in tables.values()), threads=threads)
+        for sheet, df in pulled.items():
+            if isinstance(df, Exception) or sorted(df.index) != sorted(tables[sheet].index): report.failures.append(f"{scale}: pull_all returned {sheet} incomplete ({df if isinstance(df, Exception) else len(df)})")
+        # Fail the third chunk once: the retry must append only the chunks that were not acknowledged.
+        def resume():
+            sent = worker.status()["sent"]; worker.enqueue("Resume", sales); drain(worker, sent, retries=True)
+        retry_base, cloud_sync.RETRY_BASE = cloud_sync.RETRY_BASE, 0.05
+        try:
+            worker.reset("Resume"); n0 = stub.requests; stub.fail_at = {n0 + 3}
+            times, _ = measure(resume, repeat=1)
+        finally: cloud_sync.RETRY_BASE, stub.fail_at = retry_base, set()
+        chunks = -(-len(sales) // args.sync_chunk)
+        report.add("sync.resume", scale, times, posts=stub.requests - n0, chunks=chunks)
+        with stub.lock: got = sorted(r["_rid"] for r in stub.sheets.get("Resume", []))
+        if got != sorted(int(i) for i in sales.index) or stub.requests - n0 != chunks + (chunks >= 3):
+            report.failures.append(f"{scale}: resumed push sent {stub.requests - n0} requests for {chunks} chunks and left {len(got)} of {len(sales)} rows")
+        # An endpoint that advertises no capabilities (the original Apps Script) must get one plain
+        # update per push and leave no sync state; an HTTP 200 HTML error page must fail the push.
+        legacy_server, legacy_url, legacy = gsheet_stub.serve(capabilities=())
+        plain = cloud_sync.SyncWorker(legacy_url, queue_file=os.path.join(os.getcwd(), "sync_queue_legacy.json"), threads=1, chunk_rows=args.sync_chunk)
+        def push_plain():
+            sent = plain.status()["sent"]; plain.enqueue("Legacy", sales); drain(plain, sent, retries=True)
+        retry_base, cloud_sync.RETRY_BASE = cloud_sync.RETRY_BASE, 0.05
+        try:
+            plain.reset("Legacy")
+            times, _ = measure(push_plain, repeat=1)
+            report.add("sync.legacy_full", scale, times, rows=len(sales), bytes=legacy.bytes_in)
+            with legacy.lock: got = legacy.sheets.get("Legacy", [])
+            if legacy.requests != 1 or len(got) != len(sales) or cloud_sync.ROW_KEY in (got[0] if got else {}) or cloud_sync.load_state("Legacy") is not None:
+                report.failures.append(f"{scale}: push to an update-only endpoint sent {legacy.requests} requests and left {len(got)} of {len(sales)} rows")
+            n0 = legacy.requests; legacy.html_at = {n0 + 1}
+            push_plain()
+            err = plain.status()["last_error"]
+            if legacy.requests - n0 != 2 or err is None or "not JSON" not in err[1]:
+                report.failures.append(f"{scale}: an HTML error page was not treated as a failed push ({legacy.requests - n0} requests, last error {err})")
+        finally: cloud_sync.RETRY_BASE = retry_base; legacy_server.shutdown()
+    finally: server.shutdown()
+
+# --- CONCURRENT WRITERS ---
+# Each table gets --stress writer threads doing load -> append one tagged row (and every fourth
+# time also edit a random row) -> save, retrying from a fresh load on WriteConflict. Afterwards
+# every tagged row must be in the table exactly once; lost or duplicated appends fail the run.
+STRESS_COLS = {"inventory": ("Product Name", "Cost per Unit"), "stock": ("Product Name", "Quantity"), "sales": ("Customer", "Qty"),
+               "expenditures": ("Item", "Cost"), "cash_in": ("Source", "Amount")}
+
+def stress(report, scale, args, data, load):
+    files = bench_data.FILES
+    for k, (tag, num) in STRESS_COLS.items():
+        template, counts, lock = data[k].iloc[[0]].copy(), {"conflicts": 0, "merges": 0}, threading.Lock()
+
+        def writer(w):
+            rng = np.random.default_rng(args.seed + w)
+            for i in range(args.stress_writes):
+                row = template.copy(); row[tag] = f"stress-{w}-{i}"
+                while True:
+                    df = load(k)
+                    base = storage.table_version(df)
+                    out = storage.add_rows(df, row)
+                    if i % 4 == 0:
+                        out = out.copy(); rid = df.index[rng.integers(0, len(df))]
+                        out.loc[rid, num] = pd.to_numeric(out.at[rid, num], errors="coerce") + 1
+                    try: res = storage.write_table(out, files[k], base=base)
+                    except storage.WriteConflict:
+                        with lock: counts["conflicts"] += 1
+                        continue
+                    with lock: counts["merges"] += res["merged"]
+                    break
+        threads = [threading.Thread(target=writer, args=(w,)) for w in range(args.stress)]
+        t0 = time.perf_counter()
+        for t in threads: t.start()
+        for t in threads: t.join()
+        elapsed = time.perf_counter() - t0
+        final = load(k)[tag].astype(str)
+        tagged = final[final.str.startswith("stress-")]
+        expected = args.stress * args.stress_writes
+        lost, dup = expected - tagged.nunique(), int(tagged.duplicated().sum())
+        report.add(f"stress.{k}", scale, [elapsed], ops=expected, writers=args.stress, lost=lost, duplicated=dup, **counts)
+        if lost or dup: report.failures.append(f"stress.{k}: {lost} lost, {dup} duplicated appends")
+
+# --- COMPARISON ---
+def compare(old_path, results, max_ratio):
+    with open(old_path) as f: old = {(r["case"], r["scale"]): r for r in json.load(f)["results"]}
+    worse = []
+    print(f"\n{'case':<28} {'scale':>9} {'old ms':>10} {'new ms':>10} {'ratio':>7}")
+    for r in results:
+        o = old.get((r["case"], r["scale"]))
+        if o is None or not o["median_s"]: continue
+        ratio = r["median_s"] / o["median_s"]
+        flag = " !" if ratio > max_ratio else ""
+        if flag: worse.append(r["case"])
+        print(f"{r['case']:<28} {r['scale']:>9,} {o['median_s'] * 1000:>10.2f} {r['median_s'] * 1000:>10.2f} {ratio:>6.2f}x{flag}")
+    return worse
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Headless Inventory Pro benchmarks on synthetic data.")
+    p.add_argument("--scales", default="10k,100k", help="comma-separated sales row counts, e.g. 10k,100k,1m")
+    p.add_argument("--tiers", type=int, default=4)
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--repeat", type=int, default=3)
+    p.add_argument("--backend", choices=["sqlite", "csv"], default=storage.STORAGE_BACKEND)
+    p.add_argument("--sync-max", type=bench_data.parse_scale, default=100000, help="skip sync cases above this scale")
+    p.add_argument("--sync-threads", type=int, default=cloud_sync.SYNC_THREADS, help="concurrent sheet transfers for the Push/Pull All cases")
+    p.add_argument("--sync-chunk", type=int, default=cloud_sync.CHUNK_ROWS, help="rows per sync request (the stub rejects larger ones)")
+    p.add_argument("--stress", type=int, default=0, metavar="N", help="also run N concurrent writers against each table")
+    p.add_argument("--stress-writes", type=int, default=25, help="appends per stress writer")
+    p.add_argument("--out", default="bench_report.json")
+    p.add_argument("--compare", help="older report to compare medians against")
+    p.add_argument("--max-ratio", type=float, default=1.25)
+    p.add_argument("--keep", action="store_true", help="keep the per-scale working directories")
+    args = p.parse_args(argv)
+    out, here = os.path.abspath(args.out), os.getcwd()
+    report = Report(environment(args))
+    for scale in [bench_data.parse_scale(s) for s in args.scales.split(",") if s.strip()]:
+        work = tempfile.mkdtemp(prefix=f"invpro-bench-{scale}-")
+        os.chdir(work)
+        try: run_scale(report, scale, args)
+        finally:
+            os.chdir(here)
+            old = storage.use_backend(None)
+            if isinstance(old, storage.SQLiteBackend): old.close()
+            if not args.keep: shutil.rmtree(work, ignore_errors=True)
+        report.save(out)
+    print(f"\nreport written to {out}")
+    if report.failures:
+        print("\n".join(report.failures)); return 2
+    if args.compare:
+        worse = compare(args.compare, report.results, args.max_ratio)
+        if worse:
+            print(f"{len(worse)} case(s) slower than {args.max_ratio}x: {', '.join(worse)}"); return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pricing
+
+# --- SYNTHETIC DATA ---
+# Deterministic tables shaped like the app's own: the same columns, statuses and price tiers, with
+# row ids as the index. `scale` is the number of sales rows; the other tables are sized from it.
+FILES = {"inventory": "inventory_data.csv", "stock": "stock_data.csv", "sales": "sales_data.csv",
+         "expenditures": "expenditures.csv", "cash_in": "cash_in.csv"}
+TIER_NAMES = ["Retail", "Wholesale", "Reseller", "Distributor", "VIP", "Promo"]
+SALES_ORDER = ["Date", "Customer", "Product", "Qty", "Price Tier", "Cost", "Boxed Cost", "Price Value", "Profit", "Discount", "Total", "Status", "Payment"]
+EXPENSE_ITEMS = ["Rent", "Electricity", "Water", "Internet", "Shipping", "Packaging", "Salaries", "Supplies", "Fuel", "Repairs"]
+CASH_SOURCES = ["Capital", "Bank Transfer", "GCash", "Owner Deposit", "Loan"]
+
+def parse_scale(text):
+    """'10k' -> 10000, '1m' -> 1000000, '2500' -> 2500."""
+    text = str(text).strip().lower()
+    mult = {"k": 1000, "m": 1000000}.get(text[-1:], 1)
+    return int(float(text[:-1] if mult > 1 else text) * mult)
+
+def tier_names(n):
+    return (TIER_NAMES + [f"Tier {i + 1}" for i in range(len(TIER_NAMES), n)])[:n]
+
+def _dates(rng, n, start, days):
+    return pd.Timestamp(start) + pd.to_timedelta(np.sort(rng.integers(0, days, n)), unit="D")
+
+def products(rng, n, tiers):
+    cost = rng.uniform(20, 500, n).round(2)
+    df = pd.DataFrame({"Product Name": [f"Product {i:05d}" for i in range(n)], "Cost per Unit": cost, "Boxed Cost": (cost * 1.08).round(2)})
+    for k, t in enumerate(tiers): df[t] = (cost * (1.6 - 0.1 * k)).round(2)
+    return df
+
+def generate(scale, n_tiers=4, seed=42, start="2023-01-01", days=1095):
+    """Returns {table: frame} for inventory, stock, sales, expenditures, cash_in and log."""
+    rng = np.random.default_rng(seed)
+    tiers = tier_names(n_tiers)
+    n_prod = int(min(2000, max(20, scale // 100)))
+    inv = products(rng, n_prod, tiers)
+    names = inv["Product Name"].values
+
+    n_stock = max(n_prod, scale // 10)
+    stock = pd.DataFrame({"Product Name": names[rng.integers(0, n_prod, n_stock)], "Quantity": rng.integers(1, 200, n_stock),
+                          "Status": rng.choice(["In Stock", "Bought"], n_stock, p=[0.85, 0.15]), "Date": _dates(rng, n_stock, start, days)})
+
+    n_cust = int(min(5000, max(10, scale // 20)))
+    sales = pd.DataFrame({"Date": _dates(rng, scale, start, days), "Customer": [f"Customer {i:05d}" for i in rng.integers(0, n_cust, scale)],
+                          "Product": names[rng.integers(0, n_prod, scale)], "Qty": rng.integers(1, 11, scale),
+                          "Price Tier": np.array(tiers)[rng.integers(0, len(tiers), scale)], "Cost": 0.0, "Boxed Cost": 0.0, "Price Value": 0.0,
+                          "Profit": 0.0, "Discount": np.where(rng.random(scale) < 0.1, rng.integers(1, 20, scale), 0).astype(float), "Total": 0.0,
+                          "Status": rng.choice(["Pending", "Sold", "Cancelled"], scale, p=[0.2, 0.75, 0.05]),
+                          "Payment": rng.choice(["Paid", "Unpaid"], scale, p=[0.7, 0.3])})[SALES_ORDER]
+    sales = pricing.reprice(sales, pricing.PriceIndex(inv, tiers))
+
+    n_exp, n_cash = max(10, scale // 10), max(10, scale // 20)
+    exp = pd.DataFrame({"Date": _dates(rng, n_exp, start, days), "Item": rng.choice(EXPENSE_ITEMS, n_exp), "Cost": rng.uniform(50, 5000, n_exp).round(2)})
+    cash = pd.DataFrame({"Date": _dates(rng, n_cash, start, days), "Source": rng.choice(CASH_SOURCES, n_cash), "Amount": rng.uniform(500, 50000, n_cash).round(2)})
+
+    users = [f"user{i:02d}" for i in range(12)]
+    who = np.array(users)[rng.integers(0, len(users), scale)]
+    stamps = (pd.Timestamp(start) + pd.to_timedelta(np.sort(rng.integers(0, days * 86400, scale)), unit="s")).strftime("%Y-%m-%d %I:%M:%S %p")
+    log = pd.DataFrame({"Timestamp": stamps, "Identity": [f"{u} (Staff)" for u in who],
+                        "Action Detail": [f"🟢 Sold: {q}x {p}" for q, p in zip(sales["Qty"].values, sales["Product"].values)]})
+    return {"inventory": inv, "stock": stock, "sales": sales, "expenditures": exp, "cash_in": cash, "log": log}
@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+import pricing
+
+# --- BULK IMPORT ---
+# Uploaded rows are checked in one vectorized pass; every failed check adds to a row's "Reason",
+# so the page can preview rejects before anything is written. Column names are matched without
+# regard to case or surrounding spaces, plus the aliases below.
+KINDS = {
+    "stock": {"columns": ["Product Name", "Quantity", "Status", "Date"], "required": ["Product Name", "Quantity"],
+              "defaults": {"Status": "In Stock"}, "choices": {"Status": ["In Stock", "Bought"]}, "whole": ["Quantity"],
+              "positive": ["Quantity"], "product": "Product Name", "aliases": {"product": "Product Name", "qty": "Quantity"}},
+    "sales": {"columns": ["Date", "Customer", "Product", "Qty", "Price Tier", "Discount", "Status", "Payment"], "required": ["Product", "Qty", "Price Tier"],
+              "defaults": {"Customer": "", "Discount": "0", "Status": "Pending", "Payment": "Unpaid"},
+              "choices": {"Status": ["Pending", "Sold", "Cancelled"], "Payment": ["Unpaid", "Paid"]}, "whole": ["Qty"], "positive": ["Qty"],
+              "numbers": ["Discount"], "product": "Product", "aliases": {"product name": "Product", "quantity": "Qty", "tier": "Price Tier"}},
+    "expenditures": {"columns": ["Date", "Item", "Cost"], "required": ["Item", "Cost"], "numbers": ["Cost"], "aliases": {"amount": "Cost"}},
+    "cash_in": {"columns": ["Date", "Source", "Amount"], "required": ["Source", "Amount"], "numbers": ["Amount"], "aliases": {"cost": "Amount"}},
+}
+
+def template(kind):
+    """CSV header row for a kind, for the page's template download."""
+    return (",".join(KINDS[kind]["columns"]) + "\n").encode("utf-8")
+
+def read_upload(upload):
+    """Reads an uploaded CSV or Excel file with every cell as text (Excel needs openpyxl)."""
+    if upload.name.lower().endswith((".xlsx", ".xls")): df = pd.read_excel(upload, dtype=str)
+    else: df = pd.read_csv(upload, dtype=str, keep_default_na=False, skipinitialspace=True)
+    return df.fillna("")
+
+def _match_columns(df, spec):
+    names = {c.lower(): c for c in spec["columns"]}
+    names.update(spec.get("aliases", {}))
+    return df.rename(columns=lambda c: names.get(str(c).strip().lower(), str(c).strip()))
+
+def validate(df, kind, products=(), index=None, today=None):
+    """Returns (rows ready to add, rejected rows with their file "Line" and "Reason").
+
+    Checks: required fields present, numbers parse (whole and positive where required), dates parse
+    (blank dates become `today`), choice columns hold known values, products exist, and for sales
+    that the product has a price for the tier in `index` (a pricing.PriceIndex). Sales rows come
+    back priced in one lookup."""
+    spec = KINDS[kind]
+    df = _match_columns(df, spec).reset_index(drop=True)
+    missing = [c for c in spec["required"] if c not in df.columns]
+    if missing: raise ValueError(f"Missing column(s): {', '.join(missing)}")
+    out = pd.DataFrame(index=df.index)
+    for c in spec["columns"]:
+        val = df[c].astype(str).str.strip() if c in df.columns else pd.Series("", index=df.index)
+        out[c] = val.mask(val == "", spec.get("defaults", {}).get(c, ""))
+    checks = {}
+    for c in spec["required"]: checks[f"missing {c}"] = out[c] == ""
+    for c in spec.get("whole", []) + spec.get("positive", []) + spec.get("numbers", []):
+        if c in out and not pd.api.types.is_numeric_dtype(out[c]):
+            out[c] = pd.to_numeric(out[c].str.replace(",", "", regex=False), errors="coerce")
+            checks[f"bad {c}"] = out[c].isna() & (df[c].astype(str).str.strip() != "" if c in df.columns else False)
+    for c in spec.get("whole", []): checks[f"{c} not whole"] = out[c].notna() & (out[c] != out[c].round())
+    for c in spec.get("positive", []): checks[f"{c} not above 0"] = out[c].notna() & (out[c] <= 0)
+    for c in spec.get("numbers", []): checks[f"{c} below 0"] = out[c].notna() & (out[c] < 0)
+    if "Date" in out:
+        raw = out["Date"]
+        out["Date"] = pd.to_datetime(raw, errors="coerce")
+        checks["bad Date"] = out["Date"].isna() & (raw != "")
+        out["Date"] = out["Date"].fillna(pd.Timestamp(today or pd.Timestamp.now().date())).dt.normalize()
+    for c, allowed in spec.get("choices", {}).items(): checks[f"unknown {c}"] = ~out[c].isin(allowed)
+    prod = spec.get("product")
+    if prod: checks["unknown product"] = (out[prod] != "") & ~out[prod].isin(list(products))
+    if kind == "sales" and index is not None:
+        tiers = set(index.prices.index.get_level_values("Price Tier"))
+        checks["unknown Price Tier"] = (out["Price Tier"] != "") & ~out["Price Tier"].isin(tiers)
+        found, u_p, _, _ = index.lookup(out["Product"].values, out["Price Tier"].values)
+        checks["no price for tier"] = pd.Series(~(found & ~np.isnan(u_p.astype(float))), index=out.index) & ~checks["unknown product"] & ~checks["unknown Price Tier"] & (out["Price Tier"] != "")
+    flags = pd.DataFrame(checks, index=out.index).fillna(False).astype(bool)
+    bad = flags.any(axis=1)
+    rejects = df[bad].copy()
+    rejects.insert(0, "Line", rejects.index + 2)
+    rejects["Reason"] = flags[bad].dot(flags.columns + "; ").str.rstrip("; ") if bad.any() else ""
+    good = out[~bad].copy()
+    for c in spec.get("whole", []): good[c] = good[c].astype("int64")
+    if kind == "sales":
+        for c in pricing.PRICED_COLS: good[c] = 0.0
+        good = pricing.reprice(good, index)
+    return good.reset_index(drop=True), rejects.reset_index(drop=True)
@@ -0,0 +1,357 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+import perf
+import storage
+
+# --- SYNC CONFIG ---
+# Sheet protocol (POST JSON; the Apps Script side is gsheet_apps_script.gs):
+#   {"action": "update", "sheet", "data": [rows]}                replace the whole sheet
+#   {"action": "append", "sheet", "key": "_rid", "data": [rows]}  add rows
+#   {"action": "patch",  "sheet", "key": "_rid", "data": [rows]}  overwrite rows with matching _rid
+#   {"action": "delete", "sheet", "key": "_rid", "ids": [_rid]}   remove rows
+# Every reply must be JSON {"status": "ok", "rows": n}; anything else (an Apps Script HTML error page
+# included) fails the push, which is then retried. The plain "update" is all an endpoint has to
+# support, and all it gets unless GET ?capabilities=1 answers {"capabilities": [...]} listing the
+# other actions. With "append" a keyed full push (rows carry a stable "_rid" column = the local row
+# id) goes out as an update plus appends in ordered chunks of CHUNK_ROWS rows, so no single request
+# hits the Apps Script payload/time limits; with "patch" and "delete" as well, later pushes send
+# only the rows that changed, and a row count that disagrees with ours triggers a drift check.
+# Up to SYNC_THREADS sheets transfer at once over one pooled session.
+QUEUE_FILE = "sync_queue.json"
+STATE_DIR = "sync_state"
+ROW_KEY = "_rid"
+RETRY_BASE, RETRY_MAX = 2.0, 300.0
+POST_TIMEOUT, FETCH_TIMEOUT = 15, 10
+CHUNK_ROWS = int(os.environ.get("INV_PRO_SYNC_CHUNK_ROWS", 2000))
+SYNC_THREADS = int(os.environ.get("INV_PRO_SYNC_THREADS", 3))
+DELTA_ACTIONS = frozenset({"append", "patch", "delete"})
+
+class BadReply(Exception):
+    """The endpoint answered HTTP 200 without a JSON {"status": "ok"} body (or without the row count)."""
+
+def pooled_session(size=SYNC_THREADS):
+    """A requests.Session keeping up to `size` connections alive per host, one per transfer thread."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=size, pool_maxsize=size)
+    session.mount("http://", adapter); session.mount("https://", adapter)
+    return session
+
+def to_records(df):
+    """Converts a frame into JSON-safe row dicts the way the Apps Script endpoint expects them."""
+    df_sync = df.copy()
+    for col in df_sync.columns:
+        if isinstance(df_sync[col].dtype, pd.CategoricalDtype): df_sync[col] = df_sync[col].astype(object)
+        if pd.api.types.is_datetime64_any_dtype(df_sync[col]) or pd.api.types.is_extension_array_dtype(df_sync[col]):
+            df_sync[col] = df_sync[col].astype(str)
+        df_sync[col] = df_sync[col].fillna("")
+    return df_sync.to_dict(orient='records')
+
+def to_keyed_records(df):
+    recs = to_records(df)
+    for r, rid in zip(recs, df.index): r[ROW_KEY] = int(rid)
+    return recs
+
+def fetch_sheet(url, sheet_name, session=None):
+    response = (session or requests).get(url, params={"sheet": sheet_name}, timeout=FETCH_TIMEOUT)
+    response.raise_for_status()
+    return pd.DataFrame(response.json().get("data", []))
+
+def pull_all(url, sheets, threads=SYNC_THREADS, session=None, fetch=None):
+    """Fetches sheets concurrently. Returns {sheet: frame, or the exception that fetch raised};
+    frames that carry ROW_KEY come back indexed by it so local row ids survive the round trip.
+    `fetch(sheet)` defaults to fetch_sheet over a pooled session."""
+    if fetch is None:
+        session = session or pooled_session(threads)
+        fetch = lambda sheet: fetch_sheet(url, sheet, session)
+    def one(sheet):
+        df = fetch(sheet)
+        if df is None: raise ValueError("no data returned")
+        if ROW_KEY in df.columns:
+            ids = pd.to_numeric(df[ROW_KEY], errors="coerce")
+            df = df.drop(columns=[ROW_KEY])
+            if ids.notna().all() and ids.is_unique: df.index = ids.astype("int64").values
+        return df
+    with ThreadPoolExecutor(max_workers=max(1, threads), thread_name_prefix="gsheet-pull") as pool:
+        futures = {sheet: pool.submit(one, sheet) for sheet in sheets}
+    return {sheet: f.exception() or f.result() for sheet, f in futures.items()}
+
+def _write_json(path, obj):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f: json.dump(obj, f)
+    os.replace(tmp, path)
+
+# --- DELTA STATE ---
+# Per sheet: the columns and {row id: content hash} the remote copy was last acknowledged with.
+def _state_path(sheet): return os.path.join(STATE_DIR, "".join(c if c.isalnum() else "_" for c in sheet) + ".pkl")
+
+def load_state(sheet):
+    try: return pd.read_pickle(_state_path(sheet))
+    except Exception: return None
+
+def _write_state(sheet, state):
+    os.makedirs(STATE_DIR, exist_ok=True)
+    path = _state_path(sheet)
+    pd.to_pickle(state, path + ".tmp")
+    os.replace(path + ".tmp", path)
+
+def save_state(sheet, cols, hashes): _write_state(sheet, {"cols": cols, "hashes": hashes})
+
+def drop_state(sheet):
+    try: os.remove(_state_path(sheet))
+    except OSError: pass
+
+def diff_rows(old, new):
+    """Returns (inserted, updated, deleted) row ids between two {row id: hash} series."""
+    known = new.index.isin(old.index)
+    common = new.index[known]
+    updated = common[new.loc[common].values != old.reindex(common).values]
+    return new.index[~known], updated, old.index[~old.index.isin(new.index)]
+
+# --- BACKGROUND WORKER ---
+class SyncWorker:
+    """Drains outbound sheet pushes on `threads` daemon threads, one sheet per thread at a time.
+
+    Pushes of the same sheet coalesce into the newest snapshot. Failed pushes are retried with
+    exponential backoff; chunks already acknowledged are kept, so a retry resumes where the
+    failure left off. The set of pending sheets is journalled to QUEUE_FILE so it survives a
+    restart; on recovery the snapshot is re-read through `loader(sheet)`, which by then returns
+    the latest saved data anyway. Append-only sheets that may be in the journal must be passed as
+    `tails` (see register_tail), since the threads can pick up recovered entries straight away.
+    `capabilities` pins the endpoint's optional actions instead of asking it (see capabilities())."""
+
+    def __init__(self, url, loader=None, queue_file=QUEUE_FILE, threads=SYNC_THREADS, chunk_rows=CHUNK_ROWS, tails=None, capabilities=None):
+        self.url, self.loader, self.queue_file, self.chunk_rows = url, loader, queue_file, max(1, chunk_rows)
+        self.caps = None if capabilities is None else frozenset(capabilities)
+        self.cond = threading.Condition()
+        self.pending = {}  # sheet -> {"df", "queued_at", "attempts", "next_try", "seq", "verify"}
+        self.tails = dict(tails or {})  # append-only sheets: sheet -> source(after_id) returning new rows indexed by id
+        self.running, self.progress = set(), {}  # sheets being pushed; sheet -> (rows sent, rows to send)
+        self.seq = 0
+        self.last_success, self.last_error, self.sent = None, None, 0
+        self.full_pushes, self.delta_rows, self.drift_resyncs, self.chunks = 0, 0, 0, 0
+        self.session = pooled_session(threads)
+        self._recover()
+        self.threads = [threading.Thread(target=self._run, name=f"gsheet-sync-{i}", daemon=True) for i in range(max(1, threads))]
+        for t in self.threads: t.start()
+
+    def _recover(self):
+        try:
+            with open(self.queue_file) as f: saved = json.load(f)
+        except (OSError, ValueError): return
+        for sheet, meta in saved.items():
+            self.seq += 1
+            self.pending[sheet] = {"df": None, "queued_at": meta.get("queued_at"), "attempts": meta.get("attempts", 0), "next_try": 0.0, "seq": self.seq, "verify": meta.get("verify", False)}
+
+    def _journal(self):
+        try: _write_json(self.queue_file, {s: {"queued_at": p["queued_at"], "attempts": p["attempts"], "verify": p["verify"]} for s, p in self.pending.items()})
+        except OSError: pass
+
+    def enqueue(self, sheet, df, verify=False):
+        with self.cond:
+            self.seq += 1
+            verify = verify or self.pending.get(sheet, {}).get("verify", False)
+            self.pending[sheet] = {"df": df, "queued_at": datetime.now().isoformat(timespec="seconds"), "attempts": 0, "next_try": 0.0, "seq": self.seq, "verify": verify}
+            self._journal()
+            self.cond.notify_all()
+
+    def register_tail(self, sheet, source):
+        """Marks sheet as append-only: pushes send just the rows after the last acknowledged id."""
+        with self.cond:
+            self.tails[sheet] = source
+            if sheet in self.pending: self.cond.notify_all()
+
+    def reset(self, sheet):
+        """Forgets what the remote copy holds, so the next push of sheet is a full update."""
+        drop_state(sheet)
+
+    def adopt(self, sheet, df):
+        """Records df as what the remote copy holds (e.g. right after pulling it), so the next push is a delta."""
+        if df is not None and df.index.is_unique and pd.api.types.is_integer_dtype(df.index):
+            save_state(sheet, [str(c) for c in df.columns], storage.row_hashes(df))
+        else: drop_state(sheet)
+
+    def status(self):
+        with self.cond:
+            return {"depth": len(self.pending), "sheets": sorted(self.pending), "last_success": self.last_success,
+                    "last_error": self.last_error, "sent": self.sent, "running": sorted(self.running),
+                    "progress": {s: self.progress[s] for s in sorted(self.running) if s in self.progress},
+                    "full_pushes": self.full_pushes, "delta_rows": self.delta_rows, "drift_resyncs": self.drift_resyncs,
+                    "chunks": self.chunks, "retrying": sum(1 for p in self.pending.values() if p["attempts"] > 0)}
+
+    def capabilities(self):
+        """The optional actions the endpoint advertises, asked once. A reply that is not JSON or lists
+        none (an endpoint that predates them) means full "update" pushes only; a network error raises,
+        so the push is retried and the endpoint asked again."""
+        with self.cond: caps = self.caps
+        if caps is not None: return caps
+        response = self.session.get(self.url, params={"capabilities": 1}, timeout=FETCH_TIMEOUT)
+        response.raise_for_status()
+        try: caps = frozenset(response.json().get("capabilities") or ())
+        except (ValueError, AttributeError, TypeError): caps = frozenset()
+        with self.cond: self.caps = caps
+        return caps
+
+    def _delta(self): return DELTA_ACTIONS <= self.capabilities()
+
+    def _next_job(self):
+        with self.cond:
+            while True:
+                now = time.monotonic()
+                due = [(p["next_try"], s) for s, p in self.pending.items() if p["next_try"] <= now and s not in self.running]
+                if due:
+                    sheet = min(due)[1]
+                    self.running.add(sheet); self.progress[sheet] = (0, 0)
+                    return sheet, dict(self.pending[sheet])
+                # A sheet already being pushed by another thread wakes us when it finishes.
+                waits = [p["next_try"] - now for s, p in self.pending.items() if s not in self.running]
+                self.cond.wait(timeout=max(0.0, min(waits)) if waits else None)
+
+    def _count(self, **deltas):
+        with self.cond:
+            for name, n in deltas.items(): setattr(self, name, getattr(self, name) + n)
+
+    def _post(self, payload):
+        t0 = time.perf_counter()
+        response = self.session.post(self.url, json=payload, timeout=POST_TIMEOUT)
+        perf.record("push", time.perf_counter() - t0, len(payload.get("data", payload.get("ids", ()))), len(response.request.body or b""))
+        if response.status_code != 200: raise requests.HTTPError(f"HTTP {response.status_code}")
+        try: reply = response.json()
+        except ValueError: raise BadReply(f"not JSON ({response.headers.get('Content-Type', 'no content type')})")
+        if not isinstance(reply, dict): raise BadReply("not a JSON object")
+        if reply.get("status") != "ok": raise BadReply(reply.get("message") or f"status {reply.get('status')!r}")
+        rows = reply.get("rows")
+        # Keyed requests are the ones whose acknowledgement is saved as sync state, so they need the count
+        if "key" in payload and (isinstance(rows, bool) or not isinstance(rows, int)): raise BadReply("no row count")
+        self._count(chunks=1)
+        return rows
+
+    def _send(self, sheet, action, df, done, total, first_action=None):
+        """Posts df's rows as ordered chunks (ids only for "delete"). Yields (rows acknowledged so
+        far, remote row count) after each chunk, so callers can record progress as it happens.
+        With first_action="update" the sheet is rebuilt from these rows, so every reply must count
+        exactly the rows sent so far; one that does not stops the push before the next chunk."""
+        for i in range(0, len(df), self.chunk_rows):
+            part = df.iloc[i:i + self.chunk_rows]
+            body = {"ids": [int(x) for x in part.index]} if action == "delete" else {"data": to_keyed_records(part)}
+            rows = self._post({"sheet": sheet, "action": first_action if i == 0 and first_action else action, "key": ROW_KEY, **body})
+            if first_action == "update" and rows != i + len(part): raise BadReply(f"{sheet} holds {rows} rows after {i + len(part)} were sent")
+            with self.cond: self.progress[sheet] = (done + i + len(part), total)
+            yield i + len(part), rows
+
+    def _full(self, sheet, df, hashes):
+        keyed = df.index.is_unique and pd.api.types.is_integer_dtype(df.index)
+        drop_state(sheet)
+        # Rows without stable ids cannot be resumed, and an endpoint without "append" cannot take a
+        # continuation, so those go as the one plain update every endpoint understands.
+        if not keyed or "append" not in self.capabilities():
+            rows = self._post({"sheet": sheet, "action": "update", "data": to_records(df)})
+            self._count(full_pushes=1)
+            return rows
+        # The acknowledged prefix is saved even when a later chunk fails; the retry then finds
+        # state and appends only the rows that never made it.
+        cols, sent, rows = [str(c) for c in df.columns], 0, None
+        try:
+            for sent, rows in self._send(sheet, "append", df, 0, len(df), first_action="update"): pass
+        finally:
+            if sent: save_state(sheet, cols, hashes.iloc[:sent])
+        self._count(full_pushes=1)
+        return rows
+
+    def _push(self, sheet, df):
+        if df is None and self.loader: df = self.loader(sheet)
+        if df is None or df.empty: return True
+        cols, hashes = [str(c) for c in df.columns], storage.row_hashes(df)
+        state = load_state(sheet) if self._delta() else None
+        if state is None or state["cols"] != cols or not df.index.is_unique or not pd.api.types.is_integer_dtype(df.index):
+            self._full(sheet, df, hashes); return True
+        acked = state["hashes"]
+        ins, upd, dels = diff_rows(acked, hashes)
+        total, rows = len(ins) + len(upd) + len(dels), None
+        n_ins = n_upd = n_del = 0
+        # Acknowledged chunks are folded into the saved state even on failure, so a retry only resends the rest.
+        try:
+            for n_ins, rows in self._send(sheet, "append", df.loc[ins], 0, total): pass
+            for n_upd, rows in self._send(sheet, "patch", df.loc[upd], len(ins), total): pass
+            for n_del, rows in self._send(sheet, "delete", acked.loc[dels].to_frame(), len(ins) + len(upd), total): pass
+        finally:
+            if n_ins or n_upd or n_del:
+                acked = pd.concat([acked, hashes.loc[ins[:n_ins]]])
+                acked.loc[upd[:n_upd]] = hashes.loc[upd[:n_upd]]
+                acked = acked.drop(dels[:n_del]); save_state(sheet, cols, acked)
+                self._count(delta_rows=n_ins + n_upd + n_del)
+        if rows is not None and int(rows) != len(acked): self.verify(sheet, df, hashes)
+        return True
+
+    def _push_tail(self, sheet):
+        if "append" not in self.capabilities():  # the whole log, as one plain update
+            df = self.tails[sheet](-1)
+            if not df.empty: self._post({"sheet": sheet, "action": "update", "data": to_records(df)}); self._count(full_pushes=1)
+            return True
+        state = load_state(sheet)
+        last = state.get("last") if isinstance(state, dict) else None
+        df = self.tails[sheet](-1 if last is None else last)
+        if df.empty: return True
+        sent = 0
+        try:
+            for sent, _ in self._send(sheet, "append", df, 0, len(df), first_action="update" if last is None else None): pass
+        finally:
+            if sent: _write_state(sheet, {"last": int(df.index[:sent].max())})
+        if last is None: self._count(full_pushes=1)
+        else: self._count(delta_rows=len(df))
+        return True
+
+    def verify(self, sheet, df=None, hashes=None):
+        """Compares the remote row ids with the acknowledged state and falls back to a full resync on drift.
+        Without delta support there is no state to compare, and every push is a full update anyway."""
+        if not self._delta(): return True
+        if df is None and self.loader: df = self.loader(sheet)
+        if df is None or df.empty: return True
+        if hashes is None: hashes = storage.row_hashes(df)
+        state, remote = load_state(sheet), fetch_sheet(self.url, sheet, self.session)
+        ok = state is not None and ROW_KEY in remote.columns and len(remote) == len(state["hashes"])
+        if ok: ok = set(pd.to_numeric(remote[ROW_KEY], errors="coerce").dropna().astype("int64")) == set(state["hashes"].index)
+        if not ok:
+            self._count(drift_resyncs=1)
+            self._full(sheet, df, hashes)
+        return ok
+
+    def _run(self):
+        while True:
+            sheet, job = self._next_job()
+            try:
+                if sheet in self.tails: self._push_tail(sheet)
+                else:
+                    if job["verify"]: self.verify(sheet, job["df"])
+                    self._push(sheet, job["df"])
+                err = None
+            except Exception as e: err = f"{sheet}: {e}"
+            with self.cond:
+                self.running.discard(sheet); self.progress.pop(sheet, None)
+                cur = self.pending.get(sheet)
+                if err is None:
+                    self.last_success, self.sent = datetime.now(), self.sent + 1
+                    if cur is not None and cur["seq"] == job["seq"]: del self.pending[sheet]
+                else:
+                    self.last_error = (datetime.now(), err)
+                    if cur is not None and cur["seq"] == job["seq"]:
+                        cur["attempts"] += 1
+                        cur["next_try"] = time.monotonic() + min(RETRY_BASE ** cur["attempts"], RETRY_MAX)
+                self._journal()
+                self.cond.notify_all()
+
+_worker = None
+_worker_lock = threading.Lock()
+
+def get_worker(url, loader=None, tails=None):
+    global _worker
+    if _worker is None:
+        with _worker_lock:
+            if _worker is None: _worker = SyncWorker(url, loader=loader, tails=tails)
+    return _worker
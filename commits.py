@@ -0,0 +1,94 @@
+from datetime import date
+import ledger
+import paging
+import perf
+import pricing
+import rollups
+import storage
+
+# --- COMMIT PATHS ---
+# The load and save sequences behind app.py's pages, kept free of Streamlit so bench.py times the
+# same code a click runs. A Store knows how the app loads each table (defaults, schema, cache key)
+# and how it queues sheet pushes; write clashes surface as storage.WriteConflict for the caller.
+LEDGER_KEY, ROLLUP_KEY = ("ledger",), ("rollup",)
+
+class Store:
+    """`schemas` maps file -> schema name, `sheets` file -> sync sheet, `push(df, sheet)` queues a
+    push (df None: the stored table), `today()` fills unparseable dates."""
+
+    def __init__(self, schemas=None, sheets=None, push=None, today=None):
+        self.schemas, self.sheets, self.push, self.today = schemas or {}, sheets or {}, push, today or date.today
+        self.defaults = {}  # file -> the defaults its frames are loaded with (also their cache key)
+
+    def parse(self, file, defaults):
+        with perf.span("parse") as ps:
+            df = storage.load_frame(file, defaults, self.schemas.get(file), today=self.today())
+            ps["rows"], ps["bytes"] = len(df), int(df.memory_usage(index=True).sum())
+        return df
+
+    def load(self, file, defaults=None):
+        """The shared, cached frame for file; copy() it before editing cells in place."""
+        if defaults is None: defaults = self.defaults[file]
+        else: self.defaults[file] = defaults
+        with perf.span("load") as ps:
+            df = storage.cached_table(file, lambda: self.parse(file, defaults), key=tuple(defaults.keys()))
+            ps["rows"] = len(df)
+        return df
+
+    def save(self, df, file, base=None, sheet=None):
+        """storage.write_table plus what every save needs: the frame just written is re-filed as the
+        cached table (unless merged) and `sheet` is queued for sync. Returns write_table's result."""
+        before = storage.table_stamp(file)
+        with perf.span("save") as ps:
+            written = storage.write_table(df, file, base=base)
+            ps["rows"] = written["inserted"] + written["updated"] + written["deleted"]
+        defaults = self.defaults.get(file)
+        if defaults is not None:
+            storage.cache_written(file, tuple(defaults.keys()), df, written, before,
+                                  lambda d: storage.prepare_frame(d, defaults, self.schemas.get(file), today=self.today()))
+        # A merged save stored more than df, so the sync worker re-reads the table instead
+        if sheet and self.push is not None: self.push(None if written["merged"] else df, sheet)
+        return written
+
+    def save_rolled(self, df, file, old_rows=None, new_rows=None, base=None, sheet=None):
+        """save() for a rolled-up table that also folds the replaced/added rows into its cached rollup."""
+        before, roll = storage.table_stamp(file), storage.peek_cached(file, ROLLUP_KEY)
+        written = self.save(df, file, base=base, sheet=sheet)
+        if roll is not None:
+            roll.update(old_rows, new_rows); storage.update_cached(file, ROLLUP_KEY, roll, before)
+        return written
+
+    def stock_ledger(self, file):
+        """Process-wide stock ledger; rebuilt from the stock table only when that table changes outside the ledger."""
+        return storage.cached_table(file, lambda: ledger.StockLedger(self.load(file)), key=LEDGER_KEY, copy=False)
+
+    def deduct_stock(self, demands, file, attempts=3):
+        """FIFO-deducts [(product, qty), ...] from stock in one write, for sales that are already saved.
+        A clash with another session's stock edit is retried against the freshly stored table, so the
+        deduction is neither lost nor applied twice. Returns the stock frame as saved (as loaded if
+        there was nothing to deduct), or None if every attempt clashed."""
+        for _ in range(attempts):
+            before, stock_ledger = storage.table_stamp(file), self.stock_ledger(file)
+            s_df = self.load(file).copy()
+            plan = stock_ledger.plan(demands)
+            if not set(plan).issubset(s_df.index):
+                stock_ledger = ledger.StockLedger(s_df); plan = stock_ledger.plan(demands)
+            if not plan: return s_df
+            s_df.loc[list(plan), "Quantity"] = list(plan.values())
+            try: written = self.save(s_df, file, base=storage.table_version(s_df), sheet=self.sheets.get(file))
+            except storage.WriteConflict: continue
+            if written["merged"]: storage.invalidate_cached(file, LEDGER_KEY)
+            else: stock_ledger.apply(plan); storage.update_cached(file, LEDGER_KEY, stock_ledger, before)
+            return s_df
+        return None
+
+    def commit_sales_edit(self, sales, view, edited, index, sales_file, stock_file, base=None):
+        """The Sales editor's commit: reprices the added and edited rows of the window, saves it merged
+        into `sales` (rollup updated), then FIFO-deducts stock for the rows newly marked Sold.
+        Returns (written, stock) with stock as from deduct_stock, or False when nothing was sold.
+        A clash on the sales save raises WriteConflict before stock is touched."""
+        ndf, newly_sold = pricing.apply_sales_edit(view, edited, index)
+        old_rows, new_rows = rollups.edit_delta(view, ndf)
+        written = self.save_rolled(paging.merge_window(sales, view, ndf), sales_file, old_rows, new_rows, base=base, sheet=self.sheets.get(sales_file))
+        if not len(newly_sold): return written, False
+        return written, self.deduct_stock([(ndf.at[i, "Product"], int(ndf.at[i, "Qty"])) for i in newly_sold], stock_file)
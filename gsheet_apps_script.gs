@@ -0,0 +1,101 @@
+// Google Apps Script web app behind Inventory Pro's Google Sheets sync (see cloud_sync.py).
+// Paste into the spreadsheet's Extensions > Apps Script, deploy as a web app (execute as you,
+// access: anyone) and point INV_PRO_GSHEET_URL at its /exec URL. gsheet_stub.py is a local copy.
+//
+// POST {"action": "update", "sheet", "data": [rows]}               replace the whole sheet
+//      {"action": "append", "sheet", "key", "data": [rows]}          add rows
+//      {"action": "patch",  "sheet", "key", "data": [rows]}          overwrite rows whose `key` matches
+//      {"action": "delete", "sheet", "key", "ids": [ids]}            remove rows whose `key` is listed
+// GET  ?sheet=Name           {"status": "ok", "data": [rows]}
+// GET  ?capabilities=1       {"status": "ok", "capabilities": CAPABILITIES}
+// Every POST answers {"status": "ok", "rows": <rows now in the sheet>} or {"status": "error",
+// "message": ...}; the app only records a push as delivered on the first. It sends chunked and
+// delta pushes only to a deployment that lists those actions in CAPABILITIES.
+var CAPABILITIES = ["append", "patch", "delete"];
+
+function reply(obj) {
+  return ContentService.createTextOutput(JSON.stringify(obj)).setMimeType(ContentService.MimeType.JSON);
+}
+
+function readRows(sheet) {
+  var values = sheet.getDataRange().getValues();
+  if (values.length === 0 || values[0].join("") === "") return {header: [], rows: []};
+  var header = values[0].map(String);
+  var rows = values.slice(1).map(function (v) {
+    var r = {};
+    header.forEach(function (h, i) { r[h] = v[i]; });
+    return r;
+  });
+  return {header: header, rows: rows};
+}
+
+function withColumns(header, rows) {
+  var seen = {};
+  header.forEach(function (h) { seen[h] = true; });
+  rows.forEach(function (r) {
+    Object.keys(r).forEach(function (h) { if (!seen[h]) { seen[h] = true; header.push(h); } });
+  });
+  return header;
+}
+
+function toValues(header, rows) {
+  return rows.map(function (r) { return header.map(function (h) { return r[h] === undefined ? "" : r[h]; }); });
+}
+
+function writeRows(sheet, header, rows) {
+  sheet.clearContents();
+  if (header.length === 0) return;
+  var values = [header].concat(toValues(header, rows));
+  sheet.getRange(1, 1, values.length, header.length).setValues(values);
+}
+
+function doGet(e) {
+  if (e.parameter.capabilities) return reply({status: "ok", capabilities: CAPABILITIES});
+  var sheet = SpreadsheetApp.getActiveSpreadsheet().getSheetByName(e.parameter.sheet);
+  return reply({status: "ok", data: sheet ? readRows(sheet).rows : []});
+}
+
+function doPost(e) {
+  var lock = LockService.getScriptLock();
+  lock.waitLock(30000);
+  try {
+    var p = JSON.parse(e.postData.contents), key = p.key, data = p.data || [];
+    var book = SpreadsheetApp.getActiveSpreadsheet();
+    var sheet = book.getSheetByName(p.sheet) || book.insertSheet(p.sheet);
+    if (p.action === "update") {
+      writeRows(sheet, withColumns([], data), data);
+      return reply({status: "ok", rows: data.length});
+    }
+    if (CAPABILITIES.indexOf(p.action) < 0) return reply({status: "error", message: "unknown action " + p.action});
+    var cur = readRows(sheet), rows = cur.rows;
+    if (p.action === "append") {
+      var header = withColumns(cur.header.slice(), data);
+      if (header.length === cur.header.length && data.length) {
+        // Same columns: write just the new rows below the existing ones
+        sheet.getRange(rows.length + 2, 1, data.length, header.length).setValues(toValues(header, data));
+        return reply({status: "ok", rows: rows.length + data.length});
+      }
+      rows = rows.concat(data);
+    } else if (p.action === "patch") {
+      var patch = {};
+      data.forEach(function (r) { patch[r[key]] = r; });
+      rows = rows.map(function (r) {
+        var n = patch[r[key]];
+        if (n === undefined) return r;
+        delete patch[r[key]];
+        return n;
+      });
+      Object.keys(patch).forEach(function (k) { rows.push(patch[k]); });
+    } else {
+      var ids = {};
+      (p.ids || []).forEach(function (id) { ids[id] = true; });
+      rows = rows.filter(function (r) { return !ids[r[key]]; });
+    }
+    writeRows(sheet, withColumns(cur.header.slice(), rows), rows);
+    return reply({status: "ok", rows: rows.length});
+  } catch (err) {
+    return reply({status: "error", message: String(err)});
+  } finally {
+    lock.releaseLock();
+  }
+}
@@ -0,0 +1,97 @@
+"""Local stand-in for the Google Apps Script endpoint, for development and benchmarks.
+
+Speaks the same protocol as cloud_sync and gsheet_apps_script.gs (update/append/patch/delete
+POSTs, GET ?sheet= and ?capabilities=1) and keeps the sheets in memory. Run
+`python gsheet_stub.py 8765` and start the app with INV_PRO_GSHEET_URL=http://127.0.0.1:8765/exec
+to sync against it.
+"""
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+CAPABILITIES = ("append", "patch", "delete")
+HTML_ERROR = b"<!DOCTYPE html><html><head><title>Error</title></head><body>Exception: Service invoked too many times</body></html>"
+
+class StubState:
+    """max_rows mimics the Apps Script payload limit (larger POSTs get HTTP 413); POSTs whose
+    running number (see `requests`) is in fail_at get HTTP 500, and in html_at an HTTP 200 HTML
+    error page like Apps Script serves, for exercising retries and resume. With capabilities=()
+    the stub behaves like an endpoint that only knows "update"."""
+
+    def __init__(self, max_rows=None, capabilities=CAPABILITIES):
+        self.lock = threading.Lock()
+        self.sheets, self.requests, self.bytes_in = {}, 0, 0
+        self.max_rows, self.fail_at, self.html_at = max_rows, set(), set()
+        self.capabilities = list(capabilities)
+
+    def apply(self, payload):
+        sheet, action, key = payload.get("sheet"), payload.get("action", "update"), payload.get("key")
+        with self.lock:
+            rows = self.sheets.setdefault(sheet, [])
+            if action == "update": rows[:] = list(payload.get("data", []))
+            elif action not in self.capabilities: return None
+            elif action == "append": rows.extend(payload.get("data", []))
+            elif action == "patch":
+                patch = {r.get(key): r for r in payload.get("data", [])}
+                rows[:] = [patch.pop(r.get(key), r) for r in rows] + list(patch.values())
+            elif action == "delete":
+                ids = set(payload.get("ids", []))
+                rows[:] = [r for r in rows if r.get(key) not in ids]
+            else: return None
+            return len(rows)
+
+class StubHandler(BaseHTTPRequestHandler):
+    state = None
+
+    def _reply(self, code, obj):
+        body = json.dumps(obj).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        if "capabilities" in query and self.state.capabilities: return self._reply(200, {"status": "ok", "capabilities": self.state.capabilities})
+        sheet = query.get("sheet", [None])[0]
+        with self.state.lock: rows = list(self.state.sheets.get(sheet, []))
+        self._reply(200, {"status": "ok", "data": rows})
+
+    def do_POST(self):
+        raw = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        with self.state.lock:
+            self.state.requests, self.state.bytes_in = self.state.requests + 1, self.state.bytes_in + len(raw)
+            failing, html = self.state.requests in self.state.fail_at, self.state.requests in self.state.html_at
+        try: payload = json.loads(raw)
+        except ValueError: return self._reply(400, {"status": "error", "message": "bad json"})
+        if failing: return self._reply(500, {"status": "error", "message": "injected failure"})
+        if html:
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(HTML_ERROR)))
+            self.end_headers()
+            return self.wfile.write(HTML_ERROR)
+        if self.state.max_rows is not None and len(payload.get("data", payload.get("ids", []))) > self.state.max_rows:
+            return self._reply(413, {"status": "error", "message": "payload too large"})
+        n = self.state.apply(payload)
+        if n is None: return self._reply(400, {"status": "error", "message": "unknown action"})
+        self._reply(200, {"status": "ok", "rows": n})
+
+    def log_message(self, *args): pass
+
+def serve(port=0, host="127.0.0.1", max_rows=None, capabilities=CAPABILITIES):
+    """Starts the stub on a background thread; returns (server, url, state)."""
+    state = StubState(max_rows, capabilities)
+    handler = type("BoundStubHandler", (StubHandler,), {"state": state})
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/exec", state
+
+if __name__ == "__main__":
+    server, url, _ = serve(int(sys.argv[1]) if len(sys.argv) > 1 else 8765)
+    print(f"Google Sheets stub listening on {url}")
+    try: threading.Event().wait()
+    except KeyboardInterrupt: server.shutdown()
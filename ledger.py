@@ -0,0 +1,70 @@
+from collections import deque
+import pandas as pd
+
+# --- STOCK LEDGER ---
+class StockLedger:
+    """Running on-hand balance and FIFO queue of open lots per product, derived from the
+    "In Stock" rows of the stock table.
+
+    Lots are [row id, qty] pairs in table order, so a deduction plan maps straight back onto
+    stock rows. Balances include zero and negative rows (as the old groupby did); only lots
+    with a positive quantity are queued, matching the old FIFO mask."""
+
+    def __init__(self, stock_df=None):
+        self.balance, self.lots, self.owner = {}, {}, {}
+        if stock_df is not None: self.rebuild(stock_df)
+
+    def rebuild(self, stock_df):
+        live = stock_df[(stock_df["Status"] == "In Stock") & stock_df["Product Name"].notna()]
+        qty = pd.to_numeric(live["Quantity"], errors="coerce").fillna(0)
+        self.balance = qty.groupby(live["Product Name"].astype(object)).sum().to_dict()
+        self.lots, self.owner = {}, {}
+        pos = qty > 0
+        for rid, prod, q in zip(live.index[pos], live["Product Name"][pos], qty[pos]):
+            self.lots.setdefault(prod, deque()).append([rid, q]); self.owner[rid] = prod
+        return self
+
+    def balances(self):
+        return pd.DataFrame({"Product Name": list(self.balance.keys()), "Quantity": list(self.balance.values())})
+
+    def receive(self, rid, product, qty, status="In Stock"):
+        if status != "In Stock" or product is None: return
+        self.balance[product] = self.balance.get(product, 0) + qty
+        if qty > 0:
+            self.lots.setdefault(product, deque()).append([rid, qty]); self.owner[rid] = product
+
+    def plan(self, demands):
+        """Works out FIFO deductions for [(product, qty), ...] applied in order, without changing
+        the ledger. Returns {stock row id: new quantity}."""
+        left, cursor = {}, {}
+        for product, needed in demands:
+            lots, i = self.lots.get(product, ()), cursor.get(product, 0)
+            while needed > 0 and i < len(lots):
+                rid, q = lots[i]
+                q = left.get(rid, q)
+                take = min(needed, q)
+                left[rid], needed = q - take, needed - take
+                if left[rid] <= 0: i += 1
+            cursor[product] = i
+        return left
+
+    def apply(self, updates):
+        """Applies a plan() result: adjusts balances and drops exhausted lots from the queues."""
+        by_product = {}
+        for rid, q in updates.items(): by_product.setdefault(self.owner[rid], {})[rid] = q
+        for product, ups in by_product.items():
+            lots = self.lots[product]
+            # FIFO only ever consumes the head of the queue, so the scan stops after the touched lots.
+            for lot in lots:
+                if not ups: break
+                if lot[0] in ups:
+                    new = ups.pop(lot[0])
+                    self.balance[product] -= lot[1] - new; lot[1] = new
+            while lots and lots[0][1] <= 0: self.owner.pop(lots.popleft()[0], None)
+
+    def verify(self, stock_df):
+        """Returns the products whose balance differs from a fresh rebuild of stock_df (empty when consistent)."""
+        fresh = StockLedger(stock_df).balance
+        keys = sorted(set(fresh) | set(self.balance), key=str)
+        rows = [(k, self.balance.get(k, 0), fresh.get(k, 0)) for k in keys if self.balance.get(k, 0) != fresh.get(k, 0)]
+        return pd.DataFrame(rows, columns=["Product Name", "Ledger", "Table"])
@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import storage
+
+# --- WINDOWED EDITING ---
+# Large tables are filtered and paged here, so only the visible slice is sent to st.data_editor
+# and diffed; merge_window() folds the edited slice back into the full table by row id.
+
+def filter_rows(df, start=None, end=None, equals=None, contains=None):
+    """Applies the date-range, exact-match and substring filters; returns the matching rows in table order."""
+    mask = np.ones(len(df), dtype=bool)
+    if (start or end) and "Date" in df.columns:
+        d = pd.to_datetime(df["Date"], errors="coerce")
+        if start: mask &= (d >= pd.Timestamp(start)).values
+        if end: mask &= (d <= pd.Timestamp(end)).values
+    for col, value in (equals or {}).items():
+        if value: mask &= (df[col] == value).values
+    for col, text in (contains or {}).items():
+        if text: mask &= df[col].astype(str).str.contains(text, case=False, regex=False, na=False).values
+    return df[mask]
+
+def page_rows(df, page=0, size=100):
+    """Returns one page of df, newest (last) rows first."""
+    return df.iloc[::-1].iloc[page * size:(page + 1) * size]
+
+def merge_window(full, before, after):
+    """Applies an editor round-trip of one slice to the full table.
+
+    Rows of `before` missing from `after` are deleted, rows present in both are overwritten when
+    they changed, and rows only in `after` are appended with fresh ids (editor-assigned ids can
+    collide with rows outside the slice)."""
+    removed = before.index[~before.index.isin(after.index)]
+    kept = after.index[after.index.isin(before.index)]
+    added = after.index[~after.index.isin(before.index)]
+    out = full.drop(index=removed)
+    changed = storage.changed_rows(after.loc[kept], before.loc[kept])
+    if len(changed):
+        out = out.copy()
+        for c in after.columns:
+            if c not in out.columns: continue
+            vals = after.loc[changed, c]
+            if vals.dtype != out[c].dtype:
+                # Keep the stored column's dtype where the values allow it, so untouched rows keep
+                # their exact representation (and content hash); otherwise widen to object.
+                if pd.api.types.is_integer_dtype(out[c]) and pd.api.types.is_numeric_dtype(vals) and vals.notna().all() and (vals == vals.round()).all():
+                    vals = vals.astype(out[c].dtype)
+                else: out[c] = out[c].astype(object)
+            out.loc[changed, c] = vals
+    if len(added): out = storage.add_rows(out, after.loc[added].reindex(columns=out.columns))
+    return out
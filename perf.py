@@ -0,0 +1,79 @@
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+import pandas as pd
+
+# --- PERFORMANCE COUNTERS ---
+# Each rerun collects per-operation totals (calls, seconds, rows, bytes) in a small dict, and
+# finish() files them in a process-wide rolling window as one entry per (rerun, operation).
+# Operations: "load", "parse" (cache misses inside load), "save", "sync" (queueing a push),
+# "diff" (editor comparisons), "render" (the rest of the script run) and "rerun" (the whole run).
+# Sheet POSTs made by the sync worker are recorded as "push" under page "(background)". Spans
+# outside a rerun are ignored, so instrumented helpers stay usable from tools and benchmarks.
+ENABLED = os.environ.get("INV_PRO_PERF", "1") != "0"
+WINDOW_SECONDS = int(os.environ.get("INV_PRO_PERF_WINDOW", 3600))
+MAX_ENTRIES = 50000
+NESTED = {"parse"}  # timed inside another op, so not subtracted again when booking "render"
+COLUMNS = ["Time", "Page", "User", "Op", "Calls", "Seconds", "Rows", "Bytes"]
+
+_local = threading.local()
+_window = deque(maxlen=MAX_ENTRIES)
+_window_lock = threading.Lock()
+
+def begin(page, user):
+    """Starts collecting for the rerun on this thread; a run that never reached finish() is dropped."""
+    if ENABLED: _local.run = {"page": page, "user": user, "start": time.perf_counter(), "ops": {}}
+
+def _add(run, op, seconds, rows=0, nbytes=0):
+    tot = run["ops"].get(op)
+    if tot is None: run["ops"][op] = [1, seconds, rows, nbytes]
+    else: tot[0] += 1; tot[1] += seconds; tot[2] += rows; tot[3] += nbytes
+
+@contextmanager
+def span(op, rows=0, nbytes=0):
+    """Times the block as `op`. The yielded dict's "rows"/"bytes" may be set inside the block."""
+    run = getattr(_local, "run", None)
+    if run is None:
+        yield {}; return
+    info, t0 = {"rows": rows, "bytes": nbytes}, time.perf_counter()
+    try: yield info
+    finally: _add(run, op, time.perf_counter() - t0, info["rows"], info["bytes"])
+
+def record(op, seconds, rows=0, nbytes=0, page="(background)", user="sync worker"):
+    """Files one measurement taken outside a rerun (e.g. on the sync worker thread)."""
+    if ENABLED: _file(datetime.now(), page, user, {op: [1, seconds, rows, nbytes]})
+
+def finish():
+    """Ends this thread's rerun: the time not covered by other spans is booked as "render"."""
+    run = getattr(_local, "run", None)
+    _local.run = None
+    if run is None: return
+    total = time.perf_counter() - run["start"]
+    _add(run, "render", max(0.0, total - sum(t[1] for op, t in run["ops"].items() if op not in NESTED)))
+    _add(run, "rerun", total)
+    _file(datetime.now(), run["page"], run["user"], run["ops"])
+
+def _file(when, page, user, ops):
+    cutoff = when.timestamp() - WINDOW_SECONDS
+    with _window_lock:
+        for op, (calls, secs, rows, nbytes) in ops.items(): _window.append((when, page, user, op, calls, secs, rows, nbytes))
+        while _window and _window[0][0].timestamp() < cutoff: _window.popleft()
+
+def entries():
+    """Returns the rolling window as a frame of COLUMNS, oldest first."""
+    cutoff = datetime.now().timestamp() - WINDOW_SECONDS
+    with _window_lock: rows = [e for e in _window if e[0].timestamp() >= cutoff]
+    return pd.DataFrame(rows, columns=COLUMNS)
+
+def summary(df=None):
+    """Per page, user and operation: reruns seen, calls, total/mean/p95 milliseconds per rerun, rows and MB."""
+    df = entries() if df is None else df
+    if df.empty: return pd.DataFrame(columns=["Page", "User", "Op", "Reruns", "Calls", "Total ms", "Mean ms", "p95 ms", "Rows", "MB"])
+    g = df.groupby(["Page", "User", "Op"], sort=True)
+    out = pd.DataFrame({"Reruns": g.size(), "Calls": g["Calls"].sum(), "Total ms": g["Seconds"].sum() * 1000,
+                        "Mean ms": g["Seconds"].mean() * 1000, "p95 ms": g["Seconds"].quantile(0.95) * 1000,
+                        "Rows": g["Rows"].sum(), "MB": g["Bytes"].sum() / 1048576})
+    return out.reset_index()
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import storage
+
+# --- SALES REPRICING ENGINE ---
+# Price Value, Cost and Boxed Cost come from the product database; Total and Profit follow from
+# them: Total = (Price Value - Discount) * Qty and Profit = Total - Boxed Cost * Qty.
+PRICED_COLS = ["Price Value", "Cost", "Boxed Cost", "Total", "Profit"]
+
+class PriceIndex:
+    """Product/tier lookup tables built once per version of the product database."""
+
+    def __init__(self, db_df, tiers):
+        base = db_df.dropna(subset=["Product Name"]).drop_duplicates("Product Name", keep="first")
+        self.costs = base.set_index("Product Name")[["Cost per Unit", "Boxed Cost"]].apply(pd.to_numeric, errors="coerce")
+        tiers = [t for t in tiers if t in base.columns]
+        long = base.melt(id_vars="Product Name", value_vars=tiers, var_name="Price Tier", value_name="Price Value")
+        self.prices = pd.to_numeric(long.set_index(["Product Name", "Price Tier"])["Price Value"], errors="coerce")
+
+    def lookup(self, products, tiers):
+        """Returns (found, unit price, unit cost, boxed cost) arrays aligned with the inputs."""
+        key = pd.MultiIndex.from_arrays([pd.Series(products, dtype="object"), pd.Series(tiers, dtype="object")])
+        named = pd.Series(products, dtype="object").fillna("").astype(str).ne("").values & pd.Series(tiers, dtype="object").fillna("").astype(str).ne("").values
+        found = named & key.isin(self.prices.index)
+        u_p = self.prices.reindex(key).values
+        costs = self.costs.reindex(key.get_level_values(0))
+        return found, u_p, costs["Cost per Unit"].values, costs["Boxed Cost"].values
+
+def reprice(df, index, rows=None):
+    """Returns a copy of df with PRICED_COLS recomputed for `rows` (every row when None).
+
+    Rows without a known product/tier pair keep their current values, matching the old
+    per-row loop in the Sales editor."""
+    out = df.copy()
+    for c in PRICED_COLS: out[c] = pd.to_numeric(out[c], errors="coerce").astype(float) if c in out.columns else 0.0
+    sub = out if rows is None else out.loc[rows]
+    if sub.empty: return out
+    found, u_p, u_c, b_c = index.lookup(sub["Product"].values, sub["Price Tier"].values)
+    qty = pd.to_numeric(sub["Qty"], errors="coerce").astype(float).values
+    disc = pd.to_numeric(sub["Discount"], errors="coerce").astype(float).values
+    tot = (u_p - disc) * qty
+    vals = np.column_stack([u_p, u_c, b_c, tot, tot - b_c * qty])
+    out.loc[sub.index[found], PRICED_COLS] = vals[found]
+    return out
+
+def apply_sales_edit(view, edited, index):
+    """Reprices the rows an editor round-trip of `view` added or changed. Returns (new frame, ids of
+    existing rows whose Status just flipped to Sold), the rows that need a FIFO stock deduction."""
+    changed = storage.changed_rows(edited, view)
+    ndf = reprice(edited, index, rows=changed)
+    was_sold = view["Status"].reindex(changed)
+    newly_sold = changed[(ndf.loc[changed, "Status"] == "Sold").values & changed.isin(view.index) & (was_sold != "Sold").values]
+    return ndf, newly_sold
@@ -0,0 +1,79 @@
+import pandas as pd
+import storage
+
+# --- MONTHLY ROLLUPS ---
+# Materialized (year, month[, product]) sums behind the Dashboard. Rows whose Date cannot be
+# parsed land in year 0 / month 0 so all-time totals still include them, as the old code did.
+SALES_MEASURES = ["rows", "qty", "revenue", "profit", "paid_total", "unpaid_total", "paid_n", "paid_qty", "paid_revenue", "paid_profit"]
+
+def _periods(df):
+    d = pd.to_datetime(df["Date"], errors="coerce")
+    return d.dt.year.fillna(0).astype(int).values, d.dt.month.fillna(0).astype(int).values
+
+def _num(df, col): return pd.to_numeric(df[col], errors="coerce").fillna(0.0).astype(float).values if col in df.columns else 0.0
+
+def sales_contrib(df):
+    """Per (year, month, product) measures. paid_* follow the Dashboard's rule: Payment == Paid and Profit > 0."""
+    if df.empty: return pd.DataFrame(columns=SALES_MEASURES, index=pd.MultiIndex.from_arrays([[], [], []], names=["year", "month", "product"]), dtype=float)
+    y, m = _periods(df)
+    qty, tot, prf = _num(df, "Qty"), _num(df, "Total"), _num(df, "Profit")
+    paid = (df["Payment"] == "Paid").values
+    good = paid & (prf > 0)
+    parts = pd.DataFrame({"year": y, "month": m, "product": df["Product"].astype(object).fillna("").values, "rows": 1.0, "qty": qty, "revenue": tot, "profit": prf,
+                          "paid_total": tot * paid, "unpaid_total": tot * ~paid, "paid_n": good * 1.0,
+                          "paid_qty": qty * good, "paid_revenue": tot * good, "paid_profit": prf * good})
+    return parts.groupby(["year", "month", "product"])[SALES_MEASURES].sum()
+
+def amount_contrib(col):
+    def contrib(df):
+        if df.empty: return pd.DataFrame(columns=["rows", "amount"], index=pd.MultiIndex.from_arrays([[], []], names=["year", "month"]), dtype=float)
+        y, m = _periods(df)
+        parts = pd.DataFrame({"year": y, "month": m, "rows": 1.0, "amount": _num(df, col)})
+        return parts.groupby(["year", "month"])[["rows", "amount"]].sum()
+    return contrib
+
+class Rollup:
+    """A rollup table plus the function that turns raw rows into contributions. update() adds the
+    contribution of new row versions and subtracts that of the old ones, so a write costs time
+    proportional to the rows it touched."""
+
+    def __init__(self, contrib, df):
+        self.contrib = contrib
+        self.table = contrib(df)
+
+    def update(self, old_rows=None, new_rows=None):
+        delta = None
+        if new_rows is not None and not new_rows.empty: delta = self.contrib(new_rows)
+        if old_rows is not None and not old_rows.empty:
+            gone = -self.contrib(old_rows)
+            delta = gone if delta is None else delta.add(gone, fill_value=0)
+        if delta is None: return self
+        table = self.table.add(delta, fill_value=0)
+        self.table = table[table["rows"].round(9) != 0]
+        return self
+
+    def years(self):
+        return sorted({int(y) for y in self.table.index.get_level_values("year") if y}, reverse=True)
+
+    def month(self, year, month):
+        idx = self.table.index
+        t = self.table[(idx.get_level_values("year") == year) & (idx.get_level_values("month") == month)]
+        return t.droplevel(["year", "month"]) if t.index.nlevels > 2 else t
+
+    def monthly(self, year=None):
+        """Totals per (year, month), optionally for one year; dated rows only."""
+        t = self.table.groupby(level=["year", "month"]).sum()
+        t = t[t.index.get_level_values("year") > 0]
+        return t[t.index.get_level_values("year") == year] if year is not None else t
+
+    def total(self, col): return float(self.table[col].sum())
+
+def sales_rollup(df): return Rollup(sales_contrib, df)
+def amount_rollup(df, col): return Rollup(amount_contrib(col), df)
+
+def edit_delta(old, new):
+    """Returns (old_rows, new_rows) that an editor round-trip replaced: edited and removed rows from
+    `old`, and edited and added rows from `new`."""
+    changed = storage.changed_rows(new, old)
+    removed = old.index[~old.index.isin(new.index)]
+    return old.loc[old.index.isin(changed) | old.index.isin(removed)], new.loc[changed]
@@ -0,0 +1,50 @@
+import pandas as pd
+
+# --- TABLE SCHEMA REGISTRY ---
+# In-memory dtypes per table, applied once when a table is loaded into the shared cache.
+#   "category": repeated labels (products, statuses, customers)   "datetime": datetime64[ns]
+#   "int": int64 (missing -> 0; kept float64 if fractional)        "float": float64
+#   "str": left as Python strings
+# "*" is the dtype for columns not listed (the price tier columns of the product database).
+SCHEMAS = {
+    "inventory": {"Product Name": "str", "Cost per Unit": "float", "Boxed Cost": "float", "*": "float"},
+    "stock": {"Product Name": "category", "Quantity": "int", "Status": "category", "Date": "datetime"},
+    "sales": {"Date": "datetime", "Customer": "category", "Product": "category", "Qty": "int", "Price Tier": "category",
+              "Cost": "float", "Boxed Cost": "float", "Price Value": "float", "Profit": "float", "Discount": "float",
+              "Total": "float", "Status": "category", "Payment": "category"},
+    "expenditures": {"Date": "datetime", "Item": "str", "Cost": "float"},
+    "cash_in": {"Date": "datetime", "Source": "category", "Amount": "float"},
+    "users": {"Username": "str", "Password": "str", "Role": "category", "Status": "str"},
+    "log": {"Timestamp": "str", "User": "category", "Identity": "category", "Action Detail": "str"},
+}
+
+def _coerce_col(s, kind):
+    if kind == "float": return pd.to_numeric(s, errors="coerce").astype("float64")
+    if kind == "int":
+        n = pd.to_numeric(s, errors="coerce").fillna(0)
+        return n.astype("int64") if (n == n.round()).all() else n.astype("float64")
+    if kind == "category": return s.astype("category")
+    if kind == "datetime": return pd.to_datetime(s, errors="coerce")
+    return s
+
+def coerce(df, name):
+    """Returns df with the registered dtypes of table `name` applied (unchanged for unknown tables)."""
+    schema = SCHEMAS.get(name)
+    if schema is None or df.empty and not len(df.columns): return df
+    out = df.copy()
+    for col in out.columns:
+        kind = schema.get(col, schema.get("*"))
+        if kind and kind != "str":
+            try: out[col] = _coerce_col(out[col], kind)
+            except (TypeError, ValueError): pass
+    return out
+
+def editable(df):
+    """Categoricals become plain object columns so editors accept new labels and equals() still
+    matches what st.data_editor hands back."""
+    cats = [c for c in df.columns if isinstance(df[c].dtype, pd.CategoricalDtype)]
+    return df.astype({c: object for c in cats}) if cats else df
+
+def footprint(df):
+    """Deep memory use of a frame in bytes."""
+    return int(df.memory_usage(index=True, deep=True).sum())
@@ -0,0 +1,514 @@
+import os
+import queue
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import date, datetime
+import pandas as pd
+import schema
+
+# --- STORAGE CONFIG ---
+# "sqlite" (default) keeps every table in one database file and writes row-level diffs.
+# "csv" is the original one-file-per-table layout and is used as the fallback backend.
+# Tables are always read whole and filtered in pandas, so there are no column indexes to maintain.
+STORAGE_BACKEND = os.environ.get("INV_PRO_STORAGE", "sqlite").lower()
+SQLITE_FILE = os.environ.get("INV_PRO_DB", "inventory_pro.db")
+
+def table_name(file): return os.path.splitext(os.path.basename(file))[0]
+def _q(name): return '"' + str(name).replace('"', '""') + '"'
+
+def _canon_value(v):
+    if v is pd.NaT: return "NaT"
+    if isinstance(v, (datetime, date)):
+        if isinstance(v, datetime) and v == datetime.combine(v.date(), datetime.min.time(), v.tzinfo): v = v.date()
+        return v.isoformat()
+    return str(v)
+
+def _canon(s):
+    """A column in a typed form that hashes the same however the frame happens to hold it: dates
+    (datetime64, date objects from widgets, or text in a "Date" column) as int64 nanoseconds,
+    numbers and booleans as float64, blank columns as NaN and text as text. Only mixed object
+    columns fall back to formatting each value."""
+    if isinstance(s.dtype, pd.CategoricalDtype): s = s.astype(object)
+    if pd.api.types.is_datetime64_any_dtype(s): return pd.Series(s.values.astype("datetime64[ns]").view("int64"), index=s.index)
+    if pd.api.types.is_bool_dtype(s) or pd.api.types.is_numeric_dtype(s): return s.astype("float64")
+    kind = pd.api.types.infer_dtype(s, skipna=True)
+    if kind in ("integer", "floating", "mixed-integer-float", "decimal", "boolean", "empty"): return s.astype("float64")
+    if kind in ("date", "datetime", "datetime64") or (kind == "string" and s.name == "Date"):
+        d = pd.to_datetime(s, errors="coerce")
+        # Text that does not parse keeps its own value, so two different bad dates never hash alike.
+        if not (d.isna() & s.notna() & (s.astype(str) != "")).any(): return _canon(pd.Series(d, index=s.index))
+        return s.map(_canon_value)
+    if kind == "string": return s.fillna("\x00")
+    return s.map(_canon_value)
+
+def row_hashes(df):
+    """Returns a 64-bit content hash per row; the index (row id) is not part of the hash."""
+    if df.empty: return pd.Series([], dtype="int64", index=df.index)
+    h = pd.util.hash_pandas_object(pd.DataFrame({c: _canon(df[c]) for c in df.columns}, index=df.index), index=False)
+    return pd.Series(h.values.view("int64"), index=df.index)
+
+def _sql_value(v):
+    if v is None: return None
+    try:
+        if pd.isna(v): return None
+    except (TypeError, ValueError): pass
+    if isinstance(v, pd.Timestamp): return v.date().isoformat() if v == v.normalize() else v.isoformat()
+    if isinstance(v, (datetime, date)): return v.isoformat()
+    if hasattr(v, "item"): return v.item()
+    return v
+
+def _sql_rows(df, ids, hashes):
+    return [[int(i), int(h)] + [_sql_value(v) for v in row] for i, h, row in zip(ids, hashes, df.itertuples(index=False, name=None))]
+
+def changed_rows(new, old):
+    """Returns the index labels of rows in `new` that are added or differ from `old`."""
+    if new.empty: return new.index
+    new, old = (f.astype({c: object for c in f.columns if isinstance(f[c].dtype, pd.CategoricalDtype)}) for f in (new, old))
+    prev = old.reindex(index=new.index, columns=new.columns)
+    same = (new == prev) | (new.isna() & prev.isna())
+    return new.index[~same.all(axis=1).values | ~new.index.isin(old.index)]
+
+def add_rows(df, rows):
+    """Concatenates rows onto df with fresh row ids so the storage layer sees them as pure inserts."""
+    ids = pd.to_numeric(pd.Series(df.index, dtype="object"), errors="coerce").dropna()
+    start = int(ids.max()) + 1 if not ids.empty else 0
+    rows = rows.copy()
+    rows.index = range(start, start + len(rows))
+    return pd.concat([df, rows])
+
+# --- CSV BACKEND (FALLBACK) ---
+class CSVBackend:
+    name = "csv"
+
+    def read(self, file):
+        if os.path.exists(file) and os.path.getsize(file) > 0: return pd.read_csv(file)
+        return None
+
+    def header(self, file):
+        if os.path.exists(file) and os.path.getsize(file) > 0: return [str(c) for c in pd.read_csv(file, nrows=0).columns]
+        return None
+
+    def write(self, df, file, hashes=None):
+        # Written beside the target and renamed over it, so a crash mid-write never truncates the table.
+        tmp = f"{file}.{os.getpid()}.tmp"
+        with open(tmp, "w", newline="", encoding="utf-8") as f:
+            df.to_csv(f, index=False); f.flush(); os.fsync(f.fileno())
+        os.replace(tmp, file)
+        hashes = row_hashes(df) if hashes is None else hashes
+        return {"inserted": len(df), "updated": 0, "deleted": 0, "hashes": pd.Series(hashes.values, dtype="int64")}
+
+    def patch(self, file, mine, mine_h, added, edited, removed, cur_h):
+        """Applies a merge onto the stored table. A CSV file has no row ids to address, so it is
+        read, changed and rewritten whole."""
+        current = self.read(file).reset_index(drop=True)
+        gone = edited.union(removed).intersection(current.index)
+        out = pd.concat([current.drop(index=gone), mine.loc[edited]]).sort_index(kind="stable") if len(gone) or len(edited) else current
+        out = add_rows(out, mine.loc[added]) if len(added) else out
+        res = self.write(out, file)
+        res.update(inserted=len(added), updated=len(edited), deleted=len(removed.intersection(current.index)))
+        return res
+
+    def chunks(self, file, size):
+        if os.path.exists(file) and os.path.getsize(file) > 0: yield from pd.read_csv(file, chunksize=size)
+
+    def hashes(self, file):
+        # CSV rows have no stored id; the row position is the id.
+        df = self.read(file)
+        return row_hashes(df.reset_index(drop=True)) if df is not None else pd.Series([], dtype="int64")
+
+    def stamp(self, file):
+        try:
+            st_ = os.stat(file)
+            return (st_.st_mtime_ns, st_.st_size)
+        except OSError: return None
+
+# --- SQLITE BACKEND ---
+class SQLiteBackend:
+    """One table per data file. Rows are keyed by `rid` (the DataFrame index) and carry a content
+    hash `_h`, so a save only touches the rows that were inserted, changed or removed."""
+    name = "sqlite"
+
+    def __init__(self, path=SQLITE_FILE):
+        self.path = path
+        self.lock = threading.RLock()
+        self.con = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.readers = queue.LifoQueue()  # idle read connections, see reader()
+        self.con.execute("PRAGMA journal_mode=WAL")
+        self.con.execute("PRAGMA synchronous=NORMAL")
+        self.con.execute("CREATE TABLE IF NOT EXISTS _meta (name TEXT PRIMARY KEY, version INTEGER NOT NULL)")
+        # Column indexes made by earlier versions only slowed down every insert and update.
+        for (ix,) in self.con.execute("SELECT name FROM sqlite_master WHERE type='index' AND name LIKE 'ix\\_%' ESCAPE '\\'").fetchall():
+            self.con.execute(f"DROP INDEX IF EXISTS {_q(ix)}")
+
+    @contextmanager
+    def transaction(self):
+        with self.lock:
+            self.con.execute("BEGIN IMMEDIATE")
+            try: yield self.con
+            except BaseException:
+                self.con.execute("ROLLBACK"); raise
+            self.con.execute("COMMIT")
+
+    @contextmanager
+    def reader(self):
+        """A pooled connection for whole-table reads. WAL lets it read the last committed version
+        while a write is in progress, so cache misses neither take self.lock nor block writers."""
+        try: con = self.readers.get_nowait()
+        except queue.Empty: con = sqlite3.connect(self.path, check_same_thread=False)
+        try: yield con
+        finally: self.readers.put(con)
+
+    def close(self):
+        while not self.readers.empty(): self.readers.get_nowait().close()
+        self.con.close()
+
+    def has_table(self, t):
+        with self.lock:
+            return self.con.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (t,)).fetchone() is not None
+
+    def columns(self, t):
+        with self.lock:
+            return [r[1] for r in self.con.execute(f"PRAGMA table_info({_q(t)})").fetchall() if r[1] not in ("rid", "_h")]
+
+    def _create(self, con, t, cols):
+        con.execute(f"DROP TABLE IF EXISTS {_q(t)}")
+        con.execute(f"CREATE TABLE {_q(t)} (rid INTEGER PRIMARY KEY, _h INTEGER, {', '.join(_q(c) for c in cols)})" if cols else f"CREATE TABLE {_q(t)} (rid INTEGER PRIMARY KEY, _h INTEGER)")
+
+    def _bump(self, con, t):
+        con.execute("INSERT INTO _meta (name, version) VALUES (?, 1) ON CONFLICT(name) DO UPDATE SET version = version + 1", (t,))
+
+    def stamp(self, file):
+        with self.lock:
+            row = self.con.execute("SELECT version FROM _meta WHERE name=?", (table_name(file),)).fetchone()
+        return row[0] if row else None
+
+    def read(self, file):
+        t = table_name(file)
+        with self.reader() as con:
+            if con.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (t,)).fetchone() is None: return None
+            df = pd.read_sql_query(f"SELECT * FROM {_q(t)} ORDER BY rid", con, index_col="rid")
+        df.index.name = None
+        return df.drop(columns=["_h"])
+
+    @staticmethod
+    def _assign_ids(index, stored_max):
+        # Integer index values are kept as row ids; missing, fractional or duplicate ones get fresh ids.
+        ids = pd.to_numeric(pd.Series(index, dtype="object"), errors="coerce")
+        ok = ids.notna() & (ids == ids.round()) & ~ids.duplicated()
+        nxt = int(max(ids[ok].max() if ok.any() else -1, stored_max)) + 1
+        ids[~ok] = range(nxt, nxt + int((~ok).sum()))
+        return ids.astype("int64").values
+
+    def header(self, file):
+        t = table_name(file)
+        return self.columns(t) if self.has_table(t) else None
+
+    def write(self, df, file, hashes=None):
+        """Saves df as the new content of the table in one transaction, touching only changed rows."""
+        t, cols = table_name(file), [str(c) for c in df.columns]
+        hashes = (row_hashes(df) if hashes is None else hashes).values
+        with self.transaction() as con:
+            if not self.has_table(t) or self.columns(t) != cols:
+                self._create(con, t, cols)
+                stored = pd.Series([], dtype="int64")
+            else:
+                rows = con.execute(f"SELECT rid, _h FROM {_q(t)}").fetchall()
+                stored = pd.Series([h for _, h in rows], index=[r for r, _ in rows], dtype="int64")
+            ids = self._assign_ids(df.index, stored.index.max() if not stored.empty else -1)
+            known = pd.Index(ids).isin(stored.index)
+            changed = ~known | (hashes != stored.reindex(ids, fill_value=0).values)
+            dels = stored.index[~stored.index.isin(ids)]
+            if len(dels): con.executemany(f"DELETE FROM {_q(t)} WHERE rid=?", [(int(r),) for r in dels])
+            if changed.any():
+                sql = f"INSERT OR REPLACE INTO {_q(t)} (rid, _h{''.join(', ' + _q(c) for c in cols)}) VALUES ({', '.join('?' * (len(cols) + 2))})"
+                con.executemany(sql, _sql_rows(df[changed], ids[changed], hashes[changed]))
+            self._bump(con, t)
+        return {"inserted": int((~known).sum()), "updated": int((changed & known).sum()), "deleted": len(dels), "hashes": pd.Series(hashes, index=ids)}
+
+    def patch(self, file, mine, mine_h, added, edited, removed, cur_h):
+        """Applies a merge onto the stored table without reading it: `added` rows are inserted under
+        ids after the stored maximum, `edited` rows replaced and `removed` ids deleted. The new
+        version's hashes are derived from cur_h (the stored ones) instead of re-hashing the table."""
+        t, cols = table_name(file), [str(c) for c in mine.columns]
+        with self.transaction() as con:
+            top = con.execute(f"SELECT MAX(rid) FROM {_q(t)}").fetchone()[0]
+            start = -1 if top is None else int(top)
+            new_ids = pd.RangeIndex(start + 1, start + 1 + len(added))
+            if len(removed): con.executemany(f"DELETE FROM {_q(t)} WHERE rid=?", [(int(r),) for r in removed])
+            rows = _sql_rows(mine.loc[edited], edited, mine_h.loc[edited].values) + _sql_rows(mine.loc[added], new_ids, mine_h.loc[added].values)
+            if rows:
+                sql = f"INSERT OR REPLACE INTO {_q(t)} (rid, _h{''.join(', ' + _q(c) for c in cols)}) VALUES ({', '.join('?' * (len(cols) + 2))})"
+                con.executemany(sql, rows)
+            self._bump(con, t)
+        hashes = cur_h.drop(removed, errors="ignore")
+        if len(edited): hashes.loc[edited] = mine_h.loc[edited].values
+        if len(added): hashes = pd.concat([hashes, pd.Series(mine_h.loc[added].values, index=new_ids, dtype="int64")])
+        return {"inserted": len(added), "updated": len(edited), "deleted": len(removed.intersection(cur_h.index)), "hashes": hashes}
+
+    def chunks(self, file, size):
+        # A read connection, so a long export neither holds the lock nor sees half a write.
+        t = table_name(file)
+        if not self.has_table(t): return
+        with self.reader() as con:
+            for df in pd.read_sql_query(f"SELECT * FROM {_q(t)} ORDER BY rid", con, index_col="rid", chunksize=size):
+                df.index.name = None
+                yield df.drop(columns=["_h"])
+
+    def hashes(self, file):
+        t = table_name(file)
+        with self.lock:
+            if not self.has_table(t): return pd.Series([], dtype="int64")
+            rows = self.con.execute(f"SELECT rid, _h FROM {_q(t)}").fetchall()
+        return pd.Series([h for _, h in rows], index=[r for r, _ in rows], dtype="int64")
+
+# --- MIGRATION ---
+def migrate_csv(backend, files):
+    """One-shot import of existing CSV files into a backend; tables that already exist are left alone."""
+    done = []
+    if backend.name == "csv": return done
+    for file in files:
+        if backend.has_table(table_name(file)): continue
+        try: df = CSVBackend().read(file)
+        except Exception: continue
+        if df is None: continue
+        backend.write(df, file); done.append(file)
+    return done
+
+_backend = None
+_backend_lock = threading.Lock()
+
+def get_backend(migrate_files=()):
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                backend = CSVBackend()
+                if STORAGE_BACKEND == "sqlite":
+                    try:
+                        backend = SQLiteBackend()
+                        migrate_csv(backend, migrate_files)
+                    except (sqlite3.Error, OSError): backend = CSVBackend()
+                _backend = backend
+    return _backend
+
+def use_backend(backend):
+    """Swaps the process-wide backend (benchmarks, tools), drops everything cached from the old one
+    and returns the old one (close() a SQLiteBackend that is done with)."""
+    global _backend
+    with _backend_lock: old, _backend = _backend, backend
+    clear_cache()
+    return old
+
+def read_table(file): return get_backend().read(file)
+
+def iter_table(file, size=50000):
+    """Yields the stored table in frames of up to `size` rows, in row order, without loading it whole."""
+    return get_backend().chunks(file, size)
+
+# --- WRITE COORDINATOR ---
+class WriteConflict(Exception):
+    """A save touched rows that another session changed or removed after this one loaded the table."""
+
+    def __init__(self, file, rows=()):
+        self.file, self.rows = file, list(rows)
+        super().__init__(f"{table_name(file)} was changed by another session" + (f" ({len(self.rows)} row(s) in conflict)" if self.rows else ""))
+
+class WriteCoordinator:
+    """Runs every table write on one thread, in arrival order.
+
+    A write names the table version (backend stamp) its frame was derived from. If the table has
+    moved on since, the frame's own changes against that version (appended, edited and removed
+    rows) are worked out from row hashes alone and patched onto the stored table, which is never
+    read whole for this: appends always merge (with fresh ids), edits and removals merge unless
+    another writer touched the same rows, which raises WriteConflict. Row hashes of the last HISTORY versions per table (16 bytes a row) are kept for this.
+    For older versions only the highest row id is remembered (TOP_HISTORY versions): rows above it
+    still merge as appends when the frame's other rows match the current table, anything else is
+    a conflict because it can no longer be checked."""
+    HISTORY = int(os.environ.get("INV_PRO_WRITE_HISTORY", 4))
+    TOP_HISTORY = 4096
+
+    def __init__(self):
+        self.jobs, self.history, self.tops = queue.Queue(), {}, {}
+        self.merges, self.conflicts, self.writes = 0, 0, 0
+        self.thread = threading.Thread(target=self._run, name="table-writer", daemon=True)
+        self.thread.start()
+
+    def submit(self, df, file, base=None):
+        job = {"df": df, "file": file, "base": base, "done": threading.Event()}
+        if threading.current_thread() is self.thread: self._do(job)
+        else:
+            self.jobs.put(job); job["done"].wait()
+        if "error" in job: raise job["error"]
+        return job["result"]
+
+    def _run(self):
+        while True: self._do(self.jobs.get())
+
+    def _do(self, job):
+        try: job["result"] = self._commit(job["df"], job["file"], job["base"])
+        except Exception as e: job["error"] = e
+        finally: job["done"].set()
+
+    def _remember(self, file, stamp, hashes):
+        hist = self.history.setdefault(file, OrderedDict())
+        hist[stamp] = hashes
+        while len(hist) > self.HISTORY: hist.popitem(last=False)
+        tops = self.tops.setdefault(file, OrderedDict())
+        tops[stamp] = int(hashes.index.max()) if len(hashes) else -1
+        while len(tops) > self.TOP_HISTORY: tops.popitem(last=False)
+
+    def _commit(self, df, file, base):
+        backend = get_backend()
+        cur = backend.stamp(file)
+        merged = base is not None and cur is not None and base != cur
+        if cur is not None and cur not in self.history.get(file, {}): self._remember(file, cur, backend.hashes(file))
+        elif cur is not None: self.history[file].move_to_end(cur); self.tops[file].move_to_end(cur)
+        hashes = row_hashes(df)  # the only hashing pass of a write; backends reuse it
+        if merged: res = backend.patch(file, df, hashes, *self._merge(backend, file, df, hashes, base, cur), self.history[file][cur])
+        else: res = backend.write(df, file, hashes)
+        with _cache_lock: _versions[file] = _versions.get(file, 0) + 1
+        res["version"] = backend.stamp(file)
+        res["ids"] = res["hashes"].index
+        self._remember(file, res["version"], res.pop("hashes"))
+        self.writes += 1; self.merges += merged
+        res["merged"] = merged
+        return res
+
+    def _merge(self, backend, file, mine, mine_h, base, cur):
+        """Returns (added, edited, removed) row ids of mine against its base version."""
+        base_h, cur_h = self.history.get(file, {}).get(base), self.history[file][cur]
+        if backend.header(file) != [str(c) for c in mine.columns]:
+            self.conflicts += 1; raise WriteConflict(file)
+        if base_h is None: return self._merge_appends(file, mine, mine_h, base, cur_h)
+        in_base = mine.index.isin(base_h.index)
+        added = mine.index[~in_base]
+        kept = mine.index[in_base]
+        edited = kept[mine_h.loc[kept].values != base_h.reindex(kept).values]
+        removed = base_h.index[~base_h.index.isin(mine.index)]
+        theirs = base_h.index[cur_h.reindex(base_h.index, fill_value=0).values != base_h.values]  # edited or removed since base
+        clash = theirs.intersection(edited.union(removed))
+        if len(clash):
+            self.conflicts += 1; raise WriteConflict(file, clash)
+        return added, edited, removed
+
+    def _merge_appends(self, file, mine, mine_h, base, cur_h):
+        top = self.tops.get(file, {}).get(base)
+        if top is None:
+            self.conflicts += 1; raise WriteConflict(file)
+        ids = pd.to_numeric(pd.Series(mine.index, dtype="object"), errors="coerce")
+        old = mine.index[(ids <= top).values]
+        # The base's own rows must be unchanged in mine and still stored as they are; other sessions'
+        # appends (above top, not in mine) are kept as they are.
+        cur_old = cur_h.index[cur_h.index <= top]
+        if len(old) != len(cur_old) or not old.isin(cur_old).all() or (mine_h.loc[old].values != cur_h.loc[old].values).any():
+            self.conflicts += 1; raise WriteConflict(file)
+        return mine.index.difference(old, sort=False), mine.index[:0], mine.index[:0]
+
+_writer = None
+
+def get_writer():
+    global _writer
+    if _writer is None:
+        with _backend_lock:
+            if _writer is None: _writer = WriteCoordinator()
+    return _writer
+
+def write_table(df, file, base=None):
+    """Saves df through the write coordinator. `base` is the table version (see table_version) df
+    was loaded at; None writes unconditionally. Returns the row counts plus "version", "merged" and
+    "ids" (the stored row ids, in stored order)."""
+    return get_writer().submit(df, file, base)
+
+def table_version(df):
+    """The stored table version a frame from cached_table was built from (None if unknown)."""
+    return df.attrs.get("version")
+
+def load_frame(file, defaults, schema_name=None, today=None):
+    """Reads a table with any missing default columns added, Date parsed (unparseable dates become
+    `today`) and its registered dtypes applied; an empty frame of the default columns if unreadable."""
+    try: df = read_table(file)
+    except Exception: df = None
+    if df is not None:
+        try: return prepare_frame(df, defaults, schema_name, today)
+        except Exception: pass
+    return pd.DataFrame({k: [] for k in defaults.keys()})
+
+def prepare_frame(df, defaults, schema_name=None, today=None):
+    """The loaded form of a table's rows (see load_frame); adds columns to df in place."""
+    for col in defaults.keys():
+        if col not in df.columns:
+            is_num = bool(defaults[col]) and isinstance(defaults[col][0], (int, float))
+            df[col] = 0.0 if is_num else ""
+    if not df.empty and "Date" in df.columns:
+        df["Date"] = pd.to_datetime(df["Date"], errors='coerce').fillna(pd.Timestamp(today or date.today()))
+    return schema.coerce(df, schema_name)
+
+# --- SHARED TABLE CACHE ---
+# Parsed frames are shared by every session in the process and keyed on the table's identity
+# (file mtime/size or the database version) plus a local counter bumped by write_table.
+# Callers get a shallow copy: adding/dropping columns is safe, but in-place cell edits are
+# not, so copy() before using .at/.loc assignment on a cached frame.
+_cache, _versions = {}, {}
+_cache_lock = threading.Lock()
+
+def table_stamp(file):
+    with _cache_lock: v = _versions.get(file, 0)
+    return (get_backend().stamp(file), v)
+
+def cached_table(file, build, key=(), copy=True):
+    """Returns build()'s frame for file, re-running build only when the stored table has changed.
+    With copy=False the cached object itself is returned (for derived, read-only structures)."""
+    stamp = table_stamp(file)
+    with _cache_lock: hit = _cache.get((file, key))
+    if hit is None or hit[0] != stamp:
+        hit = (stamp, build())
+        with _cache_lock: _cache[(file, key)] = hit
+    if not copy: return hit[1]
+    out = hit[1].copy(deep=False)
+    out.attrs["version"] = hit[0][0]
+    return out
+
+def peek_cached(file, key=()):
+    """Returns the cached object for file/key if it is still current, without building it."""
+    stamp = table_stamp(file)
+    with _cache_lock: hit = _cache.get((file, key))
+    return hit[1] if hit is not None and hit[0] == stamp else None
+
+def update_cached(file, key, obj, before):
+    """Re-files a derived object under the table's new stamp after the caller's own write, provided
+    nothing else wrote the table in between (otherwise the next cached_table call rebuilds it)."""
+    after = table_stamp(file)
+    if before[0] is None or after[1] != before[1] + 1: return False
+    if isinstance(before[0], int) and after[0] != before[0] + 1: return False
+    with _cache_lock: _cache[(file, key)] = (after, obj)
+    return True
+
+def cache_written(file, key, df, written, before, prepare=None):
+    """After a save that was not merged, files the frame just written (under the row ids it was
+    stored with, passed through `prepare`) as cached_table's entry for file/key, so the rerun that
+    follows a save is served from memory instead of reading and parsing the table again."""
+    if written["merged"] or len(written["ids"]) != len(df): return False
+    out = df.set_axis(written["ids"])
+    if not out.index.is_monotonic_increasing: out = out.sort_index(kind="stable")
+    if prepare is not None: out = prepare(out)
+    out.attrs.pop("version", None)
+    return update_cached(file, key, out, before)
+
+def invalidate_cached(file, key=()):
+    with _cache_lock: _cache.pop((file, key), None)
+
+def cached_frames():
+    """Returns [(file, key, frame)] for every DataFrame currently held in the shared cache."""
+    with _cache_lock: items = list(_cache.items())
+    return [(file, key, obj) for (file, key), (_, obj) in items if isinstance(obj, pd.DataFrame)]
+
+def clear_cache():
+    with _cache_lock: _cache.clear()
+
+if __name__ == "__main__":
+    import sys
+    files = sys.argv[1:] or ["inventory_data.csv", "stock_data.csv", "sales_data.csv", "expenditures.csv", "cash_in.csv", "activity_log.csv", "users_db.csv"]
+    b = SQLiteBackend()
+    for f in migrate_csv(b, files): print(f"Migrated {f} -> {b.path}:{table_name(f)}")